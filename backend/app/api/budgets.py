@@ -6,7 +6,7 @@ from app.database import get_db
 from app.auth.router import get_current_user_dependency
 from app.models import User, Budget
 from app.schemas.budget import BudgetCreate, BudgetUpdate, BudgetResponse, BudgetStatusResponse, BudgetPeriod
-from app.services.budget_service import BudgetService
+from app.services.budget_service import BudgetService, budget_spend_cache
 
 
 router = APIRouter()
@@ -56,6 +56,14 @@ def get_budgets_status(
     return result
 
 
+@router.get("/cache/stats")
+def get_budget_cache_stats(
+    current_user: User = Depends(get_current_user_dependency),
+):
+    """Hit/miss counters and size of the budget spend cache in this process."""
+    return budget_spend_cache.stats()
+
+
 @router.get("/{budget_id}/status", response_model=BudgetStatusResponse)
 def get_budget_status(
     budget_id: int,
@@ -1,20 +1,27 @@
+import os
+
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
-from typing import Dict
 
 from app.database import get_db
 from app.auth.router import get_current_user_dependency
 from app.models import Insight, User
 from app.schemas.insight import InsightResponse
-from app.services.insights_service import InsightsAI
+from app.schemas.job import JobAcceptedResponse, JobResponse
+from app.services.insights_service import InsightsAI, insights_cache_stats
+from app.services.rate_limiter import get_rate_limiter
+from app.tasks.insight_tasks import run_generate_insights_job
+from app.tasks.job_queue import enqueue_job, find_active_job, get_job
 
 
 router = APIRouter()
 ai = InsightsAI()
 
-# naive in-memory rate limit: user_id -> [timestamps]
-_GENERATE_CALLS: Dict[int, list] = {}
+# New generation jobs per user per window, enforced across all API workers
+INSIGHTS_GENERATE_LIMIT = int(os.getenv("INSIGHTS_GENERATE_LIMIT", "5"))
+INSIGHTS_GENERATE_WINDOW_SECONDS = int(os.getenv("INSIGHTS_GENERATE_WINDOW_SECONDS", "3600"))
+
+generate_rate_limiter = get_rate_limiter("insights_generate", INSIGHTS_GENERATE_LIMIT, INSIGHTS_GENERATE_WINDOW_SECONDS)
 
 
 @router.get("/", response_model=list[InsightResponse])
@@ -22,18 +29,46 @@ def list_insights(current_user: User = Depends(get_current_user_dependency), db:
     return ai.get_active_insights(current_user.id, db)
 
 
-@router.post("/generate", response_model=list[InsightResponse])
+@router.post("/generate", response_model=JobAcceptedResponse, status_code=202)
 def generate_insights(current_user: User = Depends(get_current_user_dependency), db: Session = Depends(get_db)):
-    # rate limit 5/hour
-    now = datetime.utcnow()
-    calls = _GENERATE_CALLS.get(current_user.id, [])
-    calls = [t for t in calls if now - t < timedelta(hours=1)]
-    if len(calls) >= 5:
-        raise HTTPException(status_code=429, detail="Rate limit exceeded. Try again later.")
-    calls.append(now)
-    _GENERATE_CALLS[current_user.id] = calls
-
-    return ai.generate_insights_for_user(current_user.id, db)
+    """Queue insight generation; poll the returned job id. GET / keeps serving the
+    previous insights until the job replaces them."""
+    # a request while one is queued or running joins it (and isn't rate limited)
+    dedupe_key = f"insights_generate:{current_user.id}"
+    job = find_active_job(db, dedupe_key)
+    if job:
+        return {"job_id": job.id, "status": job.status}
+
+    limited = generate_rate_limiter.hit(current_user.id)
+    if not limited.allowed:
+        raise HTTPException(
+            status_code=429,
+            detail="Rate limit exceeded. Try again later.",
+            headers={"Retry-After": str(limited.retry_after)},
+        )
+
+    job = enqueue_job(
+        db, "insights_generate", run_generate_insights_job, user_id=current_user.id, dedupe_key=dedupe_key
+    )
+    return {"job_id": job.id, "status": job.status}
+
+
+@router.get("/generate/{job_id}", response_model=JobResponse)
+def get_generate_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user_dependency),
+    db: Session = Depends(get_db),
+):
+    job = get_job(db, job_id, user_id=current_user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/cache/stats")
+def get_insights_cache_stats(current_user: User = Depends(get_current_user_dependency)):
+    """Hit rate, size and saved Groq latency of the insights response cache in this process."""
+    return insights_cache_stats()
 
 
 @router.patch("/{insight_id}/dismiss")
@@ -1,25 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
-from typing import List
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
 from pydantic import BaseModel
 import plaid
-from plaid.api import plaid_api
 from plaid.model.link_token_create_request import LinkTokenCreateRequest
 from plaid.model.link_token_create_request_user import LinkTokenCreateRequestUser
 from plaid.model.item_public_token_exchange_request import ItemPublicTokenExchangeRequest
 from plaid.model.accounts_get_request import AccountsGetRequest
-from plaid.model.transactions_get_request import TransactionsGetRequest
 from plaid.model.country_code import CountryCode
 from plaid.model.products import Products
-from plaid.configuration import Configuration
-from plaid.api_client import ApiClient
+import json
 import os
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
-from app.database import get_db
-from app.models import User, PlaidItem, Account
+from app.database import SessionLocal, get_db
+from app.models import User, PlaidItem, Account, Transaction
 from app.auth.router import get_current_user_dependency
+from app.services.account_service import upsert_accounts
+from app.services.plaid_client import get_plaid_client
+from app.services.plaid_webhook import handle_transactions_webhook, verify_webhook
 from app.services.transaction_service import sync_transactions_for_user
+from app.tasks.job_queue import enqueue_job, find_active_job
+from app.tasks.sync_tasks import run_stale_items_sync_job
 
 # Pydantic models
 class ExchangeTokenRequest(BaseModel):
@@ -27,28 +30,10 @@ class ExchangeTokenRequest(BaseModel):
 
 router = APIRouter()
 
-# Plaid configuration
-PLAID_CLIENT_ID = os.getenv("PLAID_CLIENT_ID")
-PLAID_SECRET = os.getenv("PLAID_SECRET")
-PLAID_ENV = os.getenv("PLAID_ENV", "sandbox")
-
-# Determine the host URL based on environment
-if PLAID_ENV == "sandbox":
-    host_url = "https://sandbox.plaid.com"
-elif PLAID_ENV == "development":
-    host_url = "https://development.plaid.com"
-else:
-    host_url = "https://production.plaid.com"
-
-configuration = Configuration(
-    host=host_url,
-    api_key={
-        'clientId': PLAID_CLIENT_ID,
-        'secret': PLAID_SECRET,
-    }
-)
-api_client = ApiClient(configuration)
-client = plaid_api.PlaidApi(api_client)
+# Public URL of POST /api/plaid/webhook registered on new items; webhooks are off when unset
+PLAID_WEBHOOK_URL = os.getenv("PLAID_WEBHOOK_URL")
+# GET /transactions queues a sync of items whose last sync is older than this; 0 disables the refresh
+PLAID_TRANSACTIONS_TTL_SECONDS = int(os.getenv("PLAID_TRANSACTIONS_TTL_SECONDS", "900"))
 
 @router.post("/link_token")
 async def create_link_token(
@@ -57,17 +42,20 @@ async def create_link_token(
 ):
     """Create a link token for Plaid Link initialization."""
     try:
+        link_kwargs = {}
+        if PLAID_WEBHOOK_URL:
+            link_kwargs['webhook'] = PLAID_WEBHOOK_URL
         request = LinkTokenCreateRequest(
             products=[Products('transactions'), Products('auth')],
             client_name="AI-Finance Tracker",
             country_codes=[CountryCode('US')],
             language='en',
-            webhook='https://webhook.sample.com',
             user=LinkTokenCreateRequestUser(
                 client_user_id=str(current_user.id)
-            )
+            ),
+            **link_kwargs
         )
-        response = client.link_token_create(request)
+        response = get_plaid_client().link_token_create(request)
         return {"link_token": response['link_token'], "expiration": response['expiration']}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -82,13 +70,13 @@ async def exchange_public_token(
     try:
         # Exchange public token for access token
         exchange_request = ItemPublicTokenExchangeRequest(public_token=request.public_token)
-        response = client.item_public_token_exchange(exchange_request)
+        response = get_plaid_client().item_public_token_exchange(exchange_request)
         access_token = response['access_token']
         item_id = response['item_id']
 
         # Get item info
         item_request = plaid.model.item_get_request.ItemGetRequest(access_token=access_token)
-        item_response = client.item_get(item_request)
+        item_response = get_plaid_client().item_get(item_request)
         institution_id = item_response['item']['institution_id']
 
         # Get institution info
@@ -96,7 +84,7 @@ async def exchange_public_token(
             institution_id=institution_id,
             country_codes=[CountryCode('US')]
         )
-        institution_response = client.institutions_get_by_id(institution_request)
+        institution_response = get_plaid_client().institutions_get_by_id(institution_request)
         institution_name = institution_response['institution']['name']
 
         # Store Plaid item in database
@@ -121,6 +109,26 @@ async def exchange_public_token(
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post("/webhook")
+async def plaid_webhook(request: Request):
+    """Receive Plaid webhooks; TRANSACTIONS updates schedule a debounced item sync."""
+    body = await request.body()
+    # verification may fetch a key from Plaid and enqueueing commits; keep both off the event loop
+    return await run_in_threadpool(_process_webhook, body, request.headers.get("Plaid-Verification"))
+
+def _process_webhook(body: bytes, verification_header: Optional[str]):
+    if not verify_webhook(body, verification_header):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid webhook signature")
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid webhook payload")
+    db = SessionLocal()
+    try:
+        return handle_transactions_webhook(payload, db)
+    finally:
+        db.close()
+
 async def fetch_accounts(plaid_item_id: int, db: Session):
     """Fetch accounts from Plaid and store in database."""
     plaid_item = db.query(PlaidItem).filter(PlaidItem.id == plaid_item_id).first()
@@ -129,33 +137,11 @@ async def fetch_accounts(plaid_item_id: int, db: Session):
 
     try:
         request = AccountsGetRequest(access_token=plaid_item.access_token)
-        response = client.accounts_get(request)
-        
-        for account_data in response['accounts']:
-            # Check if account already exists
-            existing_account = db.query(Account).filter(
-                Account.account_id == account_data['account_id'],
-                Account.user_id == plaid_item.user_id
-            ).first()
-            
-            if not existing_account:
-                account = Account(
-                    user_id=plaid_item.user_id,
-                    plaid_item_id=plaid_item_id,
-                    account_id=account_data['account_id'],
-                    name=account_data['name'],
-                    official_name=account_data.get('official_name'),
-                    type=str(account_data['type']),  # Convert enum to string
-                    subtype=str(account_data.get('subtype')) if account_data.get('subtype') else None,  # Convert enum to string
-                    mask=account_data.get('mask'),
-                    balance_current=float(account_data['balances']['current']) if account_data['balances']['current'] else 0,
-                    balance_available=float(account_data['balances']['available']) if account_data['balances']['available'] else 0,
-                    currency_code=account_data['balances']['iso_currency_code']
-                )
-                db.add(account)
-        
+        response = get_plaid_client().accounts_get(request)
+        upsert_accounts(db, plaid_item, response['accounts'])
         db.commit()
     except Exception as e:
+        db.rollback()
         print(f"Error fetching accounts: {e}")
 
 @router.get("/accounts")
@@ -185,45 +171,65 @@ async def get_accounts(
     return {"accounts": account_list}
 
 @router.get("/transactions")
-async def get_transactions(
+def get_transactions(
+    refresh: bool = True,
     current_user: User = Depends(get_current_user_dependency),
     db: Session = Depends(get_db)
 ):
-    """Get recent transactions for all linked accounts."""
-    plaid_items = db.query(PlaidItem).filter(PlaidItem.user_id == current_user.id).all()
-    
-    all_transactions = []
-    for plaid_item in plaid_items:
-        try:
-            # Get transactions from the last 30 days
-            start_date = (datetime.now() - timedelta(days=30)).date()
-            end_date = datetime.now().date()
-            
-            request = TransactionsGetRequest(
-                access_token=plaid_item.access_token,
-                start_date=start_date,
-                end_date=end_date
-            )
-            response = client.transactions_get(request)
-            
-            for transaction in response['transactions']:
-                all_transactions.append({
-                    "transaction_id": transaction['transaction_id'],
-                    "account_id": transaction['account_id'],
-                    "amount": -transaction['amount'],  # Invert sign: Plaid positive = expense, we want positive = income
-                    "date": transaction['date'],
-                    "name": transaction['name'],
-                    "merchant_name": transaction.get('merchant_name'),
-                    "category": transaction.get('category'),
-                    "account_name": next(
-                        (acc.name for acc in plaid_item.accounts if acc.account_id == transaction['account_id']),
-                        "Unknown Account"
-                    )
-                })
-        except Exception as e:
-            print(f"Error fetching transactions for item {plaid_item.id}: {e}")
-    
-    # Sort by date (most recent first)
-    all_transactions.sort(key=lambda x: x['date'], reverse=True)
-    
-    return {"transactions": all_transactions[:50]}  # Return last 50 transactions
+    """Get recent transactions for all linked accounts from the local store.
+
+    With ``refresh`` (the default), items not synced within
+    PLAID_TRANSACTIONS_TTL_SECONDS are synced in a background job; this
+    request returns the local rows without waiting for it.
+    """
+    if refresh and PLAID_TRANSACTIONS_TTL_SECONDS > 0:
+        stale_before = datetime.now(timezone.utc) - timedelta(seconds=PLAID_TRANSACTIONS_TTL_SECONDS)
+        has_stale = db.query(PlaidItem.id).filter(
+            PlaidItem.user_id == current_user.id,
+            (PlaidItem.transactions_synced_at.is_(None)) | (PlaidItem.transactions_synced_at < stale_before),
+        ).first() is not None
+        # one refresh in flight per user however many page loads arrive meanwhile
+        dedupe_key = f"transactions_refresh:{current_user.id}"
+        if has_stale and find_active_job(db, dedupe_key) is None:
+            try:
+                enqueue_job(
+                    db,
+                    "transactions_refresh",
+                    run_stale_items_sync_job,
+                    user_id=current_user.id,
+                    dedupe_key=dedupe_key,
+                    synced_before=stale_before,
+                )
+            except Exception as e:
+                db.rollback()
+                print(f"Error queueing transaction refresh for user {current_user.id}: {e}")
+
+    # Transactions from the last 30 days, most recent first
+    start_date = (datetime.now() - timedelta(days=30)).date()
+    rows = db.query(
+        Transaction.plaid_transaction_id,
+        Account.account_id,
+        Transaction.amount,
+        Transaction.date,
+        Transaction.name,
+        Transaction.merchant_name,
+        Transaction.category,
+        Account.name.label("account_name"),
+    ).join(Account, Transaction.account_id == Account.id).filter(
+        Transaction.user_id == current_user.id,
+        Transaction.date >= start_date,
+    ).order_by(Transaction.date.desc(), Transaction.id.desc()).limit(50).all()
+
+    return {"transactions": [
+        {
+            "transaction_id": row.plaid_transaction_id,
+            "account_id": row.account_id,
+            "amount": float(row.amount),  # stored with positive = income
+            "date": row.date,
+            "name": row.name,
+            "merchant_name": row.merchant_name,
+            "category": row.category,
+            "account_name": row.account_name,
+        }
+        for row in rows
+    ]}
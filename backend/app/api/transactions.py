@@ -1,35 +1,68 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
+import base64
+import binascii
+import csv
+import io
+import json
+import os
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import Query as OrmQuery, Session
+from typing import Any, Iterator, List, Optional, Tuple
 from datetime import date
 
-from app.database import get_db
+from app.database import SessionLocal, get_db
 from app.models import Transaction, Account, User
 from app.auth.router import get_current_user_dependency
 from app.schemas.transaction import (
     TransactionResponse,
     TransactionSummaryResponse,
 )
-from app.services.transaction_service import sync_transactions_for_user, get_transaction_summary
-from app.services.insights_service import InsightsAI
+from app.schemas.job import JobAcceptedResponse, JobResponse
+from app.services.transaction_service import get_transaction_summary
+from app.tasks.job_queue import enqueue_job, get_job
+from app.tasks.sync_tasks import run_transactions_sync_job
 
 
 router = APIRouter()
 
 
-@router.get("/", response_model=List[TransactionResponse])
-def list_transactions(
-    current_user: User = Depends(get_current_user_dependency),
-    db: Session = Depends(get_db),
-    skip: int = 0,
-    limit: int = Query(50, le=200),
+# Response header carrying the keyset cursor for the next page of GET /
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Rows fetched per round trip from the server-side cursor behind /export
+EXPORT_BATCH_SIZE = int(os.getenv("TRANSACTIONS_EXPORT_BATCH_SIZE", "1000"))
+EXPORT_COLUMNS = (
+    "id", "date", "name", "merchant_name", "amount", "primary_category", "category",
+    "pending", "account_id", "account_name", "notes",
+)
+EXPORT_MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def _encode_cursor(tx: Transaction) -> str:
+    raw = json.dumps([tx.date.isoformat(), tx.id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Tuple[date, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        tx_date, tx_id = json.loads(raw)
+        return date.fromisoformat(tx_date), int(tx_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _apply_transaction_filters(
+    q: OrmQuery,
+    user_id: int,
     account_id: Optional[int] = None,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
     category: Optional[str] = None,
     search: Optional[str] = None,
-):
-    q = db.query(Transaction).filter(Transaction.user_id == current_user.id)
+) -> OrmQuery:
+    q = q.filter(Transaction.user_id == user_id)
     if account_id is not None:
         q = q.filter(Transaction.account_id == account_id)
     if start_date is not None:
@@ -39,28 +72,178 @@ def list_transactions(
     if category is not None:
         q = q.filter(Transaction.primary_category == category)
     if search:
+        # served by the pg_trgm GIN indexes on name and merchant_name
         ilike = f"%{search}%"
         q = q.filter((Transaction.name.ilike(ilike)) | (Transaction.merchant_name.ilike(ilike)))
+    return q
+
+
+@router.get("/", response_model=List[TransactionResponse])
+def list_transactions(
+    response: Response,
+    current_user: User = Depends(get_current_user_dependency),
+    db: Session = Depends(get_db),
+    skip: int = 0,
+    limit: int = Query(50, le=200),
+    cursor: Optional[str] = None,
+    account_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    category: Optional[str] = None,
+    search: Optional[str] = None,
+    sort: str = Query("date", pattern="^(date|relevance)$"),
+):
+    """List transactions newest first.
+
+    Pass the ``X-Next-Cursor`` response header back as ``cursor`` to fetch the
+    next page; the header is absent on the last page. Cursor pages seek on
+    (date, id) so they cost the same however deep they are; ``skip`` is still
+    honoured when no cursor is given.
+
+    With ``search`` and ``sort=relevance`` matches are ordered by trigram
+    similarity to the term instead; those pages use ``skip`` only, and a
+    ``cursor`` is rejected with 400.
+    """
+    q = _apply_transaction_filters(
+        db.query(Transaction), current_user.id, account_id, start_date, end_date, category, search
+    )
+    if search and sort == "relevance":
+        if cursor:
+            raise HTTPException(status_code=400, detail="cursor is not supported with sort=relevance; use skip")
+        relevance = func.greatest(
+            func.word_similarity(search, Transaction.name),
+            func.word_similarity(search, func.coalesce(Transaction.merchant_name, "")),
+        )
+        q = q.order_by(relevance.desc(), Transaction.date.desc(), Transaction.id.desc())
+        return q.offset(skip).limit(limit).all()
 
     q = q.order_by(Transaction.date.desc(), Transaction.id.desc())
-    return q.offset(skip).limit(limit).all()
+    if cursor:
+        q = q.filter(tuple_(Transaction.date, Transaction.id) < _decode_cursor(cursor))
+    elif skip:
+        q = q.offset(skip)
+
+    rows = q.limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = _encode_cursor(rows[-1])
+    return rows
+
+
+def _export_rows(user_id: int, filters: dict) -> Iterator[Any]:
+    """Stream matching rows through a server-side cursor on a dedicated session."""
+    db = SessionLocal()
+    try:
+        q = db.query(
+            Transaction.id,
+            Transaction.date,
+            Transaction.name,
+            Transaction.merchant_name,
+            Transaction.amount,
+            Transaction.primary_category,
+            Transaction.category,
+            Transaction.pending,
+            Transaction.account_id,
+            Account.name.label("account_name"),
+            Transaction.notes,
+        ).join(Account, Transaction.account_id == Account.id)
+        q = _apply_transaction_filters(q, user_id, **filters)
+        q = q.order_by(Transaction.date.desc(), Transaction.id.desc())
+        # yield_per implies stream_results, so only one batch is held in memory
+        result = db.execute(q.statement, execution_options={"yield_per": EXPORT_BATCH_SIZE})
+        for partition in result.partitions():
+            yield partition
+    finally:
+        db.close()
+
+
+def _export_csv(user_id: int, filters: dict) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for partition in _export_rows(user_id, filters):
+        for row in partition:
+            writer.writerow([
+                row.id, row.date.isoformat(), row.name, row.merchant_name, row.amount, row.primary_category,
+                "|".join(row.category or []), row.pending, row.account_id, row.account_name, row.notes,
+            ])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
 
 
- 
+def _export_ndjson(user_id: int, filters: dict) -> Iterator[str]:
+    for partition in _export_rows(user_id, filters):
+        yield "".join(
+            json.dumps({
+                "id": row.id,
+                "date": row.date.isoformat(),
+                "name": row.name,
+                "merchant_name": row.merchant_name,
+                "amount": float(row.amount),
+                "primary_category": row.primary_category,
+                "category": row.category,
+                "pending": row.pending,
+                "account_id": row.account_id,
+                "account_name": row.account_name,
+                "notes": row.notes,
+            }) + "\n"
+            for row in partition
+        )
 
 
-@router.post("/sync")
+@router.get("/export")
+def export_transactions(
+    current_user: User = Depends(get_current_user_dependency),
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    account_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    category: Optional[str] = None,
+    search: Optional[str] = None,
+):
+    """Export matching transactions, newest first, as CSV or NDJSON.
+
+    Rows are streamed from a server-side cursor ``TRANSACTIONS_EXPORT_BATCH_SIZE``
+    at a time, so memory use does not grow with the size of the export.
+    """
+    filters = {
+        "account_id": account_id,
+        "start_date": start_date,
+        "end_date": end_date,
+        "category": category,
+        "search": search,
+    }
+    body = _export_csv if format == "csv" else _export_ndjson
+    return StreamingResponse(
+        body(current_user.id, filters),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="transactions.{format}"'},
+    )
+
+
+@router.post("/sync", response_model=JobAcceptedResponse, status_code=202)
 def sync_transactions(
     current_user: User = Depends(get_current_user_dependency),
     db: Session = Depends(get_db),
 ):
-    result = sync_transactions_for_user(current_user.id, db)
-    # trigger insights generation after sync (fire-and-forget best-effort)
-    try:
-        InsightsAI().generate_insights_for_user(current_user.id, db)
-    except Exception:
-        pass
-    return {"message": "Sync complete", **result}
+    """Queue a Plaid sync (followed by insight generation); poll the returned job id."""
+    job = enqueue_job(db, "transactions_sync", run_transactions_sync_job, user_id=current_user.id)
+    return {"job_id": job.id, "status": job.status}
+
+
+@router.get("/sync/{job_id}", response_model=JobResponse)
+def get_sync_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user_dependency),
+    db: Session = Depends(get_db),
+):
+    job = get_job(db, job_id, user_id=current_user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
 
 @router.get("/summary", response_model=TransactionSummaryResponse)
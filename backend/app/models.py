@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Numeric, Date, Enum
+from sqlalchemy import BigInteger, Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Numeric, Date, Enum, Index, text
 import enum
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -17,6 +17,8 @@ class User(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Bumped on every write that changes budget spending; part of the budget cache key
+    budget_cache_generation = Column(Integer, nullable=False, default=0, server_default=text("0"))
 
     # Relationships
     plaid_items = relationship("PlaidItem", back_populates="user")
@@ -32,6 +34,8 @@ class PlaidItem(Base):
     item_id = Column(String, unique=True, nullable=False)
     institution_id = Column(String, nullable=False)
     institution_name = Column(String, nullable=False)
+    transactions_cursor = Column(Text)  # Plaid /transactions/sync cursor; NULL until first sync
+    transactions_synced_at = Column(DateTime(timezone=True))  # last successful transaction sync
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -64,9 +68,31 @@ class Account(Base):
 
 class Transaction(Base):
     __tablename__ = "transactions"
+    __table_args__ = (
+        # per-user listing ordered newest first (and keyset pagination)
+        Index("idx_transactions_user_date_id", "user_id", text("date DESC"), text("id DESC")),
+        # category spend over a date range, answerable from the index alone
+        Index(
+            "idx_transactions_user_category_date",
+            "user_id",
+            "primary_category",
+            "date",
+            postgresql_include=["amount"],
+        ),
+        # expense-only aggregates
+        Index(
+            "idx_transactions_user_date_expenses",
+            "user_id",
+            "date",
+            postgresql_include=["primary_category", "amount"],
+            postgresql_where=text("amount < 0"),
+        ),
+        # name / merchant_name also carry pg_trgm GIN indexes for search; they
+        # live only in migration 009 since create_all cannot install the extension
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     account_id = Column(Integer, ForeignKey("accounts.id"), nullable=False, index=True)
     plaid_transaction_id = Column(String, unique=True, nullable=True, index=True)
 
@@ -87,6 +113,18 @@ class Transaction(Base):
     account = relationship("Account")
 
 
+class DailyCategoryRollup(Base):
+    """Per-user, per-day, per-category transaction totals kept in step with sync."""
+    __tablename__ = "daily_category_rollup"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    date = Column(Date, primary_key=True)
+    primary_category = Column(Text, primary_key=True)  # "Uncategorized" when the transaction has none
+    income_sum = Column(Numeric(15, 2), nullable=False, default=0)  # sum of positive amounts
+    expense_sum = Column(Numeric(15, 2), nullable=False, default=0)  # sum of expense magnitudes
+    tx_count = Column(Integer, nullable=False, default=0)
+
+
 class Insight(Base):
     __tablename__ = "insights"
 
@@ -128,3 +166,42 @@ class Budget(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     user = relationship("User", back_populates="budgets")
+
+
+class BackgroundJob(Base):
+    __tablename__ = "background_jobs"
+    __table_args__ = (
+        # at most one queued job per dedupe key; later requests coalesce into it
+        Index(
+            "uq_background_jobs_queued_dedupe_key",
+            "dedupe_key",
+            unique=True,
+            postgresql_where=text("status = 'queued'"),
+        ),
+    )
+
+    id = Column(String(32), primary_key=True)  # uuid4 hex, returned to clients for polling
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    kind = Column(String(50), nullable=False)  # e.g., "transactions_sync"
+    dedupe_key = Column(String(100))  # e.g., "plaid_item_sync:42"
+    status = Column(String(20), nullable=False, default="queued")  # queued, running, succeeded, failed
+    progress = Column(Integer, default=0)  # 0-100
+    stage = Column(Text)  # human-readable description of the current step
+    result = Column(JSONB)
+    error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+    heartbeat_at = Column(DateTime(timezone=True))  # refreshed by the owning process while queued/running
+
+    user = relationship("User")
+
+
+class RateLimitCounter(Base):
+    """Request count for one rate-limit key in one fixed window (see rate_limiter)."""
+    __tablename__ = "rate_limit_counters"
+
+    key = Column(String(200), primary_key=True)  # e.g., "insights_generate:42"
+    window_index = Column(BigInteger, primary_key=True)  # unix time // window length
+    count = Column(Integer, nullable=False, default=0)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)  # once the next window has passed
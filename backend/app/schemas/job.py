@@ -0,0 +1,24 @@
+from pydantic import BaseModel
+from typing import Optional, Any, Dict
+from datetime import datetime
+
+
+class JobAcceptedResponse(BaseModel):
+    job_id: str
+    status: str
+
+
+class JobResponse(BaseModel):
+    id: str
+    kind: str
+    status: str
+    progress: int = 0
+    stage: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
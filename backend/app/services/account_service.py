@@ -0,0 +1,82 @@
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import Integer, Numeric, cast, column, func, insert, update, values
+from sqlalchemy.orm import Session
+
+from app.models import Account, PlaidItem
+
+
+def _balance(value: Any) -> float:
+    return float(value) if value else 0
+
+
+def _batch_update_balances(db: Session, balances: List[Dict[str, Any]]) -> None:
+    """Write balances for many accounts in a single ``UPDATE ... FROM (VALUES ...)``."""
+    if not balances:
+        return
+    accounts = Account.__table__
+    new_balances = values(
+        column("id", Integer),
+        column("balance_current", Numeric(15, 2)),
+        column("balance_available", Numeric(15, 2)),
+        name="new_balances",
+    ).data([(b["id"], b["balance_current"], b["balance_available"]) for b in balances])
+    db.execute(
+        update(accounts)
+        .where(accounts.c.id == new_balances.c.id)
+        .values(
+            balance_current=cast(new_balances.c.balance_current, Numeric(15, 2)),
+            balance_available=cast(new_balances.c.balance_available, Numeric(15, 2)),
+            updated_at=func.now(),
+        )
+    )
+
+
+def upsert_accounts(db: Session, plaid_item: PlaidItem, accounts_data: List[Any]) -> Dict[str, int]:
+    """Insert new accounts and refresh balances of known ones for a Plaid item.
+
+    One SELECT finds which accounts already exist, new accounts go in with one
+    batched INSERT and existing balances with one batched UPDATE. The caller
+    commits. Returns counts of created and updated accounts.
+    """
+    plaid_ids = [a['account_id'] for a in accounts_data]
+    existing: Dict[str, int] = {}
+    if plaid_ids:
+        existing = {
+            row.account_id: row.id
+            for row in db.query(Account.account_id, Account.id).filter(
+                Account.user_id == plaid_item.user_id,
+                Account.account_id.in_(plaid_ids),
+            )
+        }
+
+    new_rows: List[Dict[str, Any]] = []
+    balance_rows: List[Dict[str, Any]] = []
+    for account_data in accounts_data:
+        balances = account_data['balances']
+        account_id: Optional[int] = existing.get(account_data['account_id'])
+        if account_id is not None:
+            balance_rows.append({
+                "id": account_id,
+                "balance_current": _balance(balances['current']),
+                "balance_available": _balance(balances['available']),
+            })
+            continue
+        new_rows.append({
+            "user_id": plaid_item.user_id,
+            "plaid_item_id": plaid_item.id,
+            "account_id": account_data['account_id'],
+            "name": account_data['name'],
+            "official_name": account_data.get('official_name'),
+            "type": str(account_data['type']),  # Convert enum to string
+            "subtype": str(account_data.get('subtype')) if account_data.get('subtype') else None,  # Convert enum to string
+            "mask": account_data.get('mask'),
+            "balance_current": _balance(balances['current']),
+            "balance_available": _balance(balances['available']),
+            "currency_code": balances['iso_currency_code'],
+        })
+
+    if new_rows:
+        db.execute(insert(Account.__table__), new_rows)
+    _batch_update_balances(db, balance_rows)
+    return {"created": len(new_rows), "updated": len(balance_rows)}
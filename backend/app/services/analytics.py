@@ -0,0 +1,186 @@
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+from sqlalchemy import Date, Float, cast, literal, select
+from sqlalchemy.orm import Session
+
+from app.models import Transaction
+
+
+UNCATEGORIZED = "Uncategorized"
+UNKNOWN_MERCHANT = "Unknown"
+
+_EPOCH = date(1970, 1, 1)
+
+
+def _day(d: date) -> int:
+    return (d - _EPOCH).days
+
+
+class TransactionFrame:
+    """Columnar view of a user's transactions for vectorized aggregation.
+
+    Holds one NumPy array per column: ``amount`` (float, positive = income),
+    ``day`` (days since 1970-01-01), ``category_code`` and ``merchant_code``
+    (indexes into ``categories`` / ``merchants``). Group-bys are
+    ``np.bincount`` over the codes, optionally restricted by a boolean mask
+    such as ``between(start, end)``. The name/merchant/category strings are
+    kept as object arrays for the few row-level slices the prompt needs.
+
+    Rows are ordered newest first.
+    """
+
+    def __init__(self, rows: Iterable[Any]):
+        category_index: Dict[str, int] = {}
+        merchant_index: Dict[str, int] = {}
+        amounts: List[float] = []
+        days: List[int] = []
+        category_codes: List[int] = []
+        merchant_codes: List[int] = []
+        names: List[str] = []
+        merchant_names: List[Optional[str]] = []
+        primary_categories: List[Optional[str]] = []
+        for amount, day, name, merchant_name, primary_category in rows:
+            amounts.append(amount)
+            days.append(day)
+            category = primary_category or UNCATEGORIZED
+            category_codes.append(category_index.setdefault(category, len(category_index)))
+            merchant = (merchant_name or name) or UNKNOWN_MERCHANT
+            merchant_codes.append(merchant_index.setdefault(merchant, len(merchant_index)))
+            names.append(name)
+            merchant_names.append(merchant_name)
+            primary_categories.append(primary_category)
+
+        self.amount = np.asarray(amounts, dtype=np.float64)
+        self.day = np.asarray(days, dtype=np.int32)
+        self.category_code = np.asarray(category_codes, dtype=np.intp)
+        self.merchant_code = np.asarray(merchant_codes, dtype=np.intp)
+        self.categories: List[str] = list(category_index)
+        self.merchants: List[str] = list(merchant_index)
+        self.names = np.asarray(names, dtype=object)
+        self.merchant_names = np.asarray(merchant_names, dtype=object)
+        self.primary_categories = np.asarray(primary_categories, dtype=object)
+        self.expense = np.where(self.amount < 0, -self.amount, 0.0)  # magnitudes
+        self.income = np.where(self.amount > 0, self.amount, 0.0)
+
+    @classmethod
+    def load(cls, db: Session, user_id: int, start_date: date, end_date: date) -> "TransactionFrame":
+        """Read the user's transactions in [start_date, end_date] with one query.
+
+        Amounts and days are converted in SQL so rows arrive as plain floats
+        and ints, ready for the arrays.
+        """
+        rows = db.execute(
+            select(
+                cast(Transaction.amount, Float),
+                Transaction.date - literal(_EPOCH, Date),
+                Transaction.name,
+                Transaction.merchant_name,
+                Transaction.primary_category,
+            )
+            .where(
+                Transaction.user_id == user_id,
+                Transaction.date >= start_date,
+                Transaction.date <= end_date,
+            )
+            .order_by(Transaction.date.desc(), Transaction.id.desc())
+        )
+        return cls(rows)
+
+    def __len__(self) -> int:
+        return len(self.amount)
+
+    # -- masks ----------------------------------------------------------------
+
+    def between(self, start_date: date, end_date: date) -> np.ndarray:
+        return (self.day >= _day(start_date)) & (self.day <= _day(end_date))
+
+    def _where(self, where: Optional[np.ndarray], extra: Optional[np.ndarray] = None) -> np.ndarray:
+        mask = np.ones(len(self.amount), dtype=bool) if where is None else where
+        return mask if extra is None else mask & extra
+
+    # -- group-bys ------------------------------------------------------------
+
+    def _group(self, codes: np.ndarray, labels: List[str], values: np.ndarray, mask: np.ndarray) -> Dict[str, float]:
+        """Sum ``values`` per code over ``mask``; only groups with a row in the mask appear."""
+        sums = np.bincount(codes[mask], weights=values[mask], minlength=len(labels))
+        present = np.bincount(codes[mask], minlength=len(labels)) > 0
+        return {labels[i]: float(sums[i]) for i in np.flatnonzero(present)}
+
+    def net_by_category(self, where: Optional[np.ndarray] = None) -> Dict[str, float]:
+        return self._group(self.category_code, self.categories, self.amount, self._where(where))
+
+    def expense_by_category(self, where: Optional[np.ndarray] = None) -> Dict[str, float]:
+        return self._group(self.category_code, self.categories, self.expense, self._where(where, self.amount < 0))
+
+    def income_by_category(self, where: Optional[np.ndarray] = None) -> Dict[str, float]:
+        return self._group(self.category_code, self.categories, self.income, self._where(where, self.amount > 0))
+
+    def expense_by_merchant(self, where: Optional[np.ndarray] = None) -> Dict[str, float]:
+        return self._group(self.merchant_code, self.merchants, self.expense, self._where(where, self.amount < 0))
+
+    def income_by_merchant(self, where: Optional[np.ndarray] = None) -> Dict[str, float]:
+        return self._group(self.merchant_code, self.merchants, self.income, self._where(where, self.amount > 0))
+
+    def totals(self, where: Optional[np.ndarray] = None) -> Dict[str, float]:
+        mask = self._where(where)
+        return {"expense": float(self.expense[mask].sum()), "income": float(self.income[mask].sum())}
+
+    # -- row slices -----------------------------------------------------------
+
+    def large_transactions(self, threshold: float = 100.0, limit: int = 50,
+                           where: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """Transactions with ``|amount| >= threshold``, newest first."""
+        idx = np.flatnonzero(self._where(where, np.abs(self.amount) >= threshold))[:limit]
+        return [
+            {
+                "date": date.fromordinal(_EPOCH.toordinal() + int(self.day[i])).isoformat(),
+                "name": self.names[i],
+                "merchant": self.merchant_names[i],
+                "amount": float(self.amount[i]),
+                "amount_abs": abs(float(self.amount[i])),
+                "direction": "expense" if self.amount[i] < 0 else ("income" if self.amount[i] > 0 else "neutral"),
+                "category": self.primary_categories[i],
+            }
+            for i in idx
+        ]
+
+    def expense_transactions(self, limit: int = 50, where: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """Expense transactions (amount magnitudes), newest first."""
+        idx = np.flatnonzero(self._where(where, self.amount < 0))[:limit]
+        return [
+            {
+                "date": date.fromordinal(_EPOCH.toordinal() + int(self.day[i])).isoformat(),
+                "name": self.names[i],
+                "merchant": self.merchant_names[i],
+                "category": self.primary_categories[i] or UNCATEGORIZED,
+                "amount": float(self.expense[i]),
+            }
+            for i in idx
+        ]
+
+
+class InsightSnapshot:
+    """Everything insight generation reads about a user, loaded once.
+
+    One ``TransactionFrame`` covers the 90-day analysis window; the 30-day and
+    prior-30-day windows are masks over it, so every stage (prompt, fallback
+    heuristics, gap-filler, period deltas) aggregates from the same read.
+    """
+
+    def __init__(self, frame: TransactionFrame, end_date: date):
+        self.frame = frame
+        self.end_date = end_date
+        self.start_date = end_date - timedelta(days=90)
+        self.last30_start = end_date - timedelta(days=30)
+        self.prev30_start = end_date - timedelta(days=60)
+        self.prev30_end = end_date - timedelta(days=31)
+        self.last_30d = frame.between(self.last30_start, end_date)
+        self.prior_30d = frame.between(self.prev30_start, self.prev30_end)
+
+    @classmethod
+    def load(cls, db: Session, user_id: int, end_date: Optional[date] = None) -> "InsightSnapshot":
+        end_date = end_date or datetime.utcnow().date()
+        frame = TransactionFrame.load(db, user_id, end_date - timedelta(days=90), end_date)
+        return cls(frame, end_date)
@@ -1,8 +1,28 @@
+import os
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 from sqlalchemy.orm import Session
 
-from app.models import Budget, Transaction, BudgetPeriod
+from app.models import Budget, BudgetPeriod, User
+from app.services.cache import LRUCache
+from app.services.rollup_service import expense_totals_for_windows
+
+
+# Spent amount per (user, generation, category, period window). The generation
+# is users.budget_cache_generation, bumped in the database whenever a sync
+# touches the user's transactions or their budgets change, so a write in any
+# process invalidates every process's entries. Old entries age out of the LRU.
+BUDGET_CACHE_MAX_ENTRIES = int(os.getenv("BUDGET_CACHE_MAX_ENTRIES", "10000"))
+BUDGET_CACHE_TTL_SECONDS = int(os.getenv("BUDGET_CACHE_TTL_SECONDS", "300"))
+
+budget_spend_cache = LRUCache(BUDGET_CACHE_MAX_ENTRIES, BUDGET_CACHE_TTL_SECONDS)
+
+
+def invalidate_budget_cache(db: Session, user_id: int) -> None:
+    """Forget cached budget spending for a user, in every process. The caller commits."""
+    db.query(User).filter(User.id == user_id).update(
+        {User.budget_cache_generation: User.budget_cache_generation + 1}, synchronize_session=False
+    )
 
 
 class BudgetService:
@@ -23,63 +43,93 @@ class BudgetService:
         db: Session
     ) -> Dict[str, any]:
         """Get the status of a budget including spent amount and progress."""
-        budget = db.query(Budget).filter(
+        row = db.query(Budget, User.budget_cache_generation).join(User, User.id == Budget.user_id).filter(
             Budget.id == budget_id,
             Budget.user_id == user_id
         ).first()
 
-        if not budget:
+        if not row:
             return None
 
-        # Calculate date range based on budget period
-        start_date, end_date = self._get_period_dates(budget.period)
-
-        # Calculate spending for this category in the period
-        spent = self._calculate_category_spending(
-            user_id=user_id,
-            category=budget.category,
-            start_date=start_date,
-            end_date=end_date,
-            db=db
-        )
-
-        budget_amount = float(budget.amount)
-        remaining = max(0, budget_amount - spent)
-        percentage_used = (spent / budget_amount * 100) if budget_amount > 0 else 0
-        is_over_budget = spent > budget_amount
-        is_near_threshold = percentage_used >= float(budget.alert_threshold)
-
-        return {
-            "budget": budget,
-            "spent": spent,
-            "remaining": remaining,
-            "percentage_used": percentage_used,
-            "is_over_budget": is_over_budget,
-            "is_near_threshold": is_near_threshold,
-            "period_start": start_date,
-            "period_end": end_date,
-        }
+        budget, generation = row
+        return self._build_statuses(user_id, [budget], generation, db)[0]
 
     def get_all_budget_statuses(
         self,
         user_id: int,
         db: Session
     ) -> List[Dict[str, any]]:
-        """Get status for all active budgets."""
-        budgets = self.get_budgets(user_id, db, active_only=True)
-        return [self.get_budget_status(user_id, budget.id, db) for budget in budgets]
+        """Get status for all active budgets.
+
+        Spending for every budget, whatever its period, comes from a single
+        grouped query rather than one query per budget.
+        """
+        # the cache generation comes back with the budgets, not as another query
+        rows = db.query(Budget, User.budget_cache_generation).join(User, User.id == Budget.user_id).filter(
+            Budget.user_id == user_id,
+            Budget.is_active == True  # noqa: E712
+        ).all()
+        budgets = [budget for budget, _ in rows]
+        generation = rows[0][1] if rows else 0
+        return self._build_statuses(user_id, budgets, generation, db)
+
+    def _build_statuses(self, user_id: int, budgets: List[Budget], generation: int, db: Session) -> List[Dict[str, any]]:
+        """Compute spent amount and progress for budgets in one spending query."""
+        # Calculate date range based on each budget's period
+        periods = [self._get_period_dates(budget.period) for budget in budgets]
+        spent_amounts = self._spent_for_windows(
+            user_id,
+            generation,
+            [(budget.category, start_date, end_date) for budget, (start_date, end_date) in zip(budgets, periods)],
+            db,
+        )
+
+        statuses = []
+        for budget, (start_date, end_date), spent in zip(budgets, periods, spent_amounts):
+            budget_amount = float(budget.amount)
+            remaining = max(0, budget_amount - spent)
+            percentage_used = (spent / budget_amount * 100) if budget_amount > 0 else 0
+            is_over_budget = spent > budget_amount
+            is_near_threshold = percentage_used >= float(budget.alert_threshold)
+
+            statuses.append({
+                "budget": budget,
+                "spent": spent,
+                "remaining": remaining,
+                "percentage_used": percentage_used,
+                "is_over_budget": is_over_budget,
+                "is_near_threshold": is_near_threshold,
+                "period_start": start_date,
+                "period_end": end_date,
+            })
+        return statuses
+
+    def _spent_for_windows(self, user_id: int, generation: int, windows: List[tuple], db: Session) -> List[float]:
+        """Spent amount per (category, start, end) window, served from the cache
+        where possible; the misses are computed together in one query."""
+        keys = [(user_id, generation) + tuple(window) for window in windows]
+        spent = [budget_spend_cache.get(key) for key in keys]
+        missing = [i for i, value in enumerate(spent) if value is None]
+        if missing:
+            computed = expense_totals_for_windows(db, user_id, [windows[i] for i in missing])
+            for i, value in zip(missing, computed):
+                spent[i] = value
+                budget_spend_cache.set(keys[i], value)
+        return spent
 
     def _get_period_dates(self, period: BudgetPeriod) -> tuple:
         """Get start and end dates for the current budget period."""
         now = datetime.utcnow()
         today = now.date()
+        # budgets.period is stored as a plain string; accept either form
+        period = period.value if hasattr(period, 'value') else period
 
-        if period == BudgetPeriod.WEEKLY:
+        if period == BudgetPeriod.WEEKLY.value:
             # Start of current week (Monday)
             days_since_monday = today.weekday()
             start_date = today - timedelta(days=days_since_monday)
             end_date = start_date + timedelta(days=6)
-        elif period == BudgetPeriod.YEARLY:
+        elif period == BudgetPeriod.YEARLY.value:
             # Current year
             start_date = today.replace(month=1, day=1)
             end_date = today.replace(month=12, day=31)
@@ -94,25 +144,6 @@ class BudgetService:
 
         return start_date, end_date
 
-    def _calculate_category_spending(
-        self,
-        user_id: int,
-        category: str,
-        start_date,
-        end_date,
-        db: Session
-    ) -> float:
-        """Calculate total spending for a category in a date range."""
-        transactions = db.query(Transaction).filter(
-            Transaction.user_id == user_id,
-            Transaction.date >= start_date,
-            Transaction.date <= end_date,
-            Transaction.primary_category == category,
-            Transaction.amount < 0  # Only expenses
-        ).all()
-
-        return sum(abs(float(t.amount)) for t in transactions)
-
     def create_budget(
         self,
         user_id: int,
@@ -132,6 +163,7 @@ class BudgetService:
             is_active=True
         )
         db.add(budget)
+        invalidate_budget_cache(db, user_id)
         db.commit()
         db.refresh(budget)
         return budget
@@ -165,6 +197,7 @@ class BudgetService:
             budget.alert_threshold = alert_threshold
 
         budget.updated_at = datetime.utcnow()
+        invalidate_budget_cache(db, user_id)
         db.commit()
         db.refresh(budget)
         return budget
@@ -181,6 +214,7 @@ class BudgetService:
 
         budget.is_active = False
         budget.updated_at = datetime.utcnow()
+        invalidate_budget_cache(db, user_id)
         db.commit()
         return True
 
@@ -1,10 +1,56 @@
+import concurrent.futures
+import hashlib
+import json
 import os
-from datetime import datetime, timedelta, date
-from typing import List, Dict, Any
+import threading
+import time
+from datetime import datetime
+from typing import List, Dict, Any, Tuple
 
 from sqlalchemy.orm import Session
 
-from app.models import Transaction, Account, Insight, Budget
+from app.models import Account, Insight, Budget
+from app.services.analytics import InsightSnapshot
+from app.services.cache import LRUCache
+from app.services.llm_gateway import LLMGatewayError, get_llm_gateway
+
+
+# LLM responses keyed by a hash of the prompt payload (minus the period dates,
+# which move every day) and the model settings. A user whose aggregates have
+# not changed since the last run gets the previous answer without a Groq call.
+# Bump INSIGHTS_CACHE_VERSION when the prompt or response parsing changes
+# meaning without changing the payload.
+INSIGHTS_CACHE_VERSION = "1"
+INSIGHTS_CACHE_MAX_ENTRIES = int(os.getenv("INSIGHTS_CACHE_MAX_ENTRIES", "5000"))
+INSIGHTS_CACHE_TTL_SECONDS = int(os.getenv("INSIGHTS_CACHE_TTL_SECONDS", "172800"))
+
+insights_response_cache = LRUCache(INSIGHTS_CACHE_MAX_ENTRIES, INSIGHTS_CACHE_TTL_SECONDS)
+
+# Extra completions requested when the reply doesn't parse into insights.
+# Transient API errors are retried (GROQ_RETRIES times) inside the gateway, so
+# one user costs at most (INSIGHTS_PARSE_RETRIES + 1) * (GROQ_RETRIES + 1) calls.
+INSIGHTS_PARSE_RETRIES = 1
+
+_saved_latency_seconds = 0.0
+_saved_latency_lock = threading.Lock()
+
+
+def insights_cache_stats() -> Dict[str, Any]:
+    """Cache counters plus the Groq latency avoided by hits in this process."""
+    stats = insights_response_cache.stats()
+    stats["saved_latency_seconds"] = round(_saved_latency_seconds, 3)
+    return stats
+
+
+def _normalize_payload(value: Any) -> Any:
+    # cents are the resolution the model sees; ignore float noise below that
+    if isinstance(value, float):
+        return round(value, 2)
+    if isinstance(value, dict):
+        return {k: _normalize_payload(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_normalize_payload(v) for v in value]
+    return value
 
 
 class InsightsAI:
@@ -22,68 +68,24 @@ class InsightsAI:
         self,
         user_id: int,
         db: Session,
-        start_date: date,
-        end_date: date,
+        snapshot: InsightSnapshot,
     ) -> str:
-        # Aggregate data for prompt
-        txs: List[Transaction] = db.query(Transaction).filter(
-            Transaction.user_id == user_id,
-            Transaction.date >= start_date,
-            Transaction.date <= end_date,
-        ).all()
-
-        # Signed aggregates (not sent to model to avoid polarity confusion)
-        by_category: Dict[str, float] = {}
-        by_merchant: Dict[str, float] = {}
-        expense_by_category: Dict[str, float] = {}
-        income_by_category: Dict[str, float] = {}
-        expense_by_merchant: Dict[str, float] = {}
-        income_by_merchant: Dict[str, float] = {}
-        large_txs: List[Dict[str, Any]] = []
-        total_expense = 0.0
-        total_income = 0.0
-        for t in txs:
-            cat = t.primary_category or "Uncategorized"
-            by_category[cat] = by_category.get(cat, 0.0) + float(t.amount)
-            m = (t.merchant_name or t.name) or "Unknown"
-            by_merchant[m] = by_merchant.get(m, 0.0) + float(t.amount)
-            if t.amount < 0:
-                expense_by_category[cat] = expense_by_category.get(cat, 0.0) + abs(float(t.amount))
-                expense_by_merchant[m] = expense_by_merchant.get(m, 0.0) + abs(float(t.amount))
-                total_expense += abs(float(t.amount))
-            elif t.amount > 0:
-                income_by_category[cat] = income_by_category.get(cat, 0.0) + float(t.amount)
-                income_by_merchant[m] = income_by_merchant.get(m, 0.0) + float(t.amount)
-                total_income += float(t.amount)
-            if abs(float(t.amount)) >= 100:
-                large_txs.append({
-                    "date": t.date.isoformat(),
-                    "name": t.name,
-                    "merchant": t.merchant_name,
-                    "amount": float(t.amount),
-                    "amount_abs": abs(float(t.amount)),
-                    "direction": "expense" if float(t.amount) < 0 else ("income" if float(t.amount) > 0 else "neutral"),
-                    "category": t.primary_category,
-                })
+        # Aggregate data for prompt (vectorized; see TransactionFrame)
+        frame = snapshot.frame
+        start_date, end_date = snapshot.start_date, snapshot.end_date
+        expense_by_category = frame.expense_by_category()
+        income_by_category = frame.income_by_category()
+        expense_by_merchant = frame.expense_by_merchant()
+        income_by_merchant = frame.income_by_merchant()
+        totals = frame.totals()
+        large_txs = frame.large_transactions(threshold=100, limit=50)
 
         # Build last-30-days expense transaction slice (amount magnitudes, capped to 50)
-        last30_start = (datetime.utcnow() - timedelta(days=30)).date()
-        expense_txs_last30 = [
-            {
-                "date": t.date.isoformat(),
-                "name": t.name,
-                "merchant": t.merchant_name,
-                "category": t.primary_category or "Uncategorized",
-                "amount": abs(float(t.amount)),  # magnitude
-            }
-            for t in txs
-            if (t.amount < 0 and t.date >= last30_start)
-        ]
-        expense_txs_last30 = sorted(expense_txs_last30, key=lambda x: x["date"], reverse=True)[:50]
+        expense_txs_last30 = frame.expense_transactions(limit=50, where=snapshot.last_30d)
 
         # Fetch budgets for this user
         budgets = db.query(Budget).filter(Budget.user_id == user_id, Budget.is_active == True).all()  # noqa: E712
-        budgets_dict = {b.category: {"amount": float(b.amount), "period": b.period.value, "threshold": float(b.alert_threshold)} for b in budgets}
+        budgets_dict = {b.category: {"amount": float(b.amount), "period": getattr(b.period, "value", b.period), "threshold": float(b.alert_threshold)} for b in budgets}
 
         prompt = {
             "instruction": (
@@ -93,12 +95,12 @@ class InsightsAI:
                 "Max 6 insights recommended; avoid repeating the same merchant/topic; consolidate duplicates."
             ),
             "period": {"start": start_date.isoformat(), "end": end_date.isoformat()},
-            "totals": {"expense": total_expense, "income": total_income},
+            "totals": totals,
             "expense_by_category": expense_by_category,
             "income_by_category": income_by_category,
             "expense_by_merchant": expense_by_merchant,
             "income_by_merchant": income_by_merchant,
-            "large_transactions": large_txs[:50],
+            "large_transactions": large_txs,
             "expenses_last_30_days": expense_txs_last30,
             "budgets": budgets_dict,
             "polarity_note": "negative = expense/cash outflow; positive = income/cash inflow. Use expense magnitudes (positive numbers) when describing spending.",
@@ -143,7 +145,6 @@ class InsightsAI:
                 }
             ],
         }
-        import json
         return json.dumps(prompt)
 
     def _clean_json_text(self, text: str) -> str:
@@ -154,69 +155,103 @@ class InsightsAI:
             return cleaned[3:-3].strip()
         return cleaned
 
-    def _call_groq_once(self, prompt: str) -> List[Dict[str, Any]]:
-        # Lazy import; handle missing API key by returning empty
-        if not self.api_key:
-            return []
+    def _parse_insights(self, content: str) -> List[Dict[str, Any]]:
+        """The insights in a completion; [] if the reply isn't usable."""
         try:
-            from groq import Groq
-            client = Groq(api_key=self.api_key)
-            completion = client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a finance insights generator that outputs ONLY JSON array."},
-                    {"role": "user", "content": prompt},
-                ],
-                temperature=self.temperature_financial,
-                max_tokens=self.max_tokens_insights,
-            )
-            content = completion.choices[0].message.content or "[]"
-            content = self._clean_json_text(content)
-            import json
-            data = json.loads(content)
-            if isinstance(data, dict) and "insights" in data:
-                return data["insights"]
-            if isinstance(data, list):
-                return data
-            return []
-        except Exception:
+            data = json.loads(self._clean_json_text(content or "[]"))
+        except ValueError:
             return []
-
-    def _call_groq(self, prompt: str) -> List[Dict[str, Any]]:
-        # Retry with exponential backoff
-        last: List[Dict[str, Any]] = []
-        for attempt in range(self.retries + 1):
-            result = self._call_groq_once(prompt)
+        if isinstance(data, dict) and "insights" in data:
+            return data["insights"]
+        if isinstance(data, list):
+            return data
+        return []
+
+    def _cache_key(self, prompt: str) -> str:
+        payload = json.loads(prompt)
+        payload.pop("period", None)
+        tag = f"{INSIGHTS_CACHE_VERSION}|{self.model}|{self.temperature_financial}|{self.max_tokens_insights}"
+        normalized = json.dumps(_normalize_payload(payload), sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(f"{tag}\n{normalized}".encode("utf-8")).hexdigest()
+
+    async def _acall_groq(self, prompt: str, key: str) -> List[Dict[str, Any]]:
+        # API errors are retried with backoff inside the gateway; here we only
+        # ask again when the model's reply didn't parse into insights.
+        started = time.perf_counter()
+        for _ in range(INSIGHTS_PARSE_RETRIES + 1):
+            try:
+                content = await get_llm_gateway().acomplete(
+                    messages=[
+                        {"role": "system", "content": "You are a finance insights generator that outputs ONLY JSON array."},
+                        {"role": "user", "content": prompt},
+                    ],
+                    model=self.model,
+                    temperature=self.temperature_financial,
+                    max_tokens=self.max_tokens_insights,
+                    retries=self.retries,
+                    retry_delay=self.retry_delay_ms / 1000.0,
+                )
+            except LLMGatewayError:
+                return []
+            result = self._parse_insights(content)
             if result:
+                # only real answers are cached; failures retry next time
+                insights_response_cache.set(key, (result, time.perf_counter() - started))
                 return result
-            if attempt == self.retries:
-                break
-            import time
-            delay = (self.retry_delay_ms / 1000.0) * (2 ** attempt)
-            time.sleep(delay)
-        return last
+        return []
+
+    def submit_groq(self, prompt: str) -> concurrent.futures.Future:
+        """Start the Groq call for ``prompt`` without waiting for it.
+
+        The future resolves to the parsed insights, or [] when there is no API
+        key or no usable answer. Cache hits come back already resolved.
+        """
+        global _saved_latency_seconds
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        if not self.api_key:
+            future.set_result([])  # nothing to retry; the heuristic fallback takes over
+            return future
+        key = self._cache_key(prompt)
+        cached = insights_response_cache.get(key)
+        if cached is not None:
+            result, latency = cached
+            with _saved_latency_lock:
+                _saved_latency_seconds += latency
+            future.set_result(result)
+            return future
+        return get_llm_gateway().run(self._acall_groq(prompt, key))
+
+    def _call_groq(self, prompt: str) -> List[Dict[str, Any]]:
+        return self.submit_groq(prompt).result()
+
+    def prepare_insights(self, user_id: int, db: Session) -> Tuple[InsightSnapshot, str]:
+        """Read the user's 90-day snapshot and build the prompt for it."""
+        # One read of the 90-day window; every stage aggregates from it
+        snapshot = InsightSnapshot.load(db, user_id)
+        return snapshot, self._build_analysis_prompt(user_id, db, snapshot)
 
     def generate_insights_for_user(self, user_id: int, db: Session) -> List[Insight]:
-        end_date = datetime.utcnow().date()
-        start_date = (datetime.utcnow() - timedelta(days=90)).date()
-        prompt = self._build_analysis_prompt(user_id, db, start_date, end_date)
-        ai_results = self._call_groq(prompt)
+        snapshot, prompt = self.prepare_insights(user_id, db)
+        return self.save_insights(user_id, db, snapshot, self._call_groq(prompt))
+
+    def save_insights(
+        self,
+        user_id: int,
+        db: Session,
+        snapshot: InsightSnapshot,
+        ai_results: List[Dict[str, Any]],
+    ) -> List[Insight]:
+        """Turn the model's answer (or the heuristics, without one) into the
+        user's active insights, replacing the previous set."""
+        frame = snapshot.frame
+        start_date, end_date = snapshot.start_date, snapshot.end_date
 
         insights: List[Insight] = []
 
         # Fallback heuristic if AI not available or empty
         if not ai_results:
             # Simple heuristic: if spending in any category < -500 in last 30d, raise warning
-            last30_start = (datetime.utcnow() - timedelta(days=30)).date()
-            txs = db.query(Transaction).filter(
-                Transaction.user_id == user_id,
-                Transaction.date >= last30_start,
-                Transaction.date <= end_date,
-            ).all()
-            by_cat: Dict[str, float] = {}
-            for t in txs:
-                cat = t.primary_category or "Uncategorized"
-                by_cat[cat] = by_cat.get(cat, 0.0) + float(t.amount)
+            by_cat: Dict[str, float] = frame.net_by_category(where=snapshot.last_30d)
             for cat, amt in by_cat.items():
                 if amt < -500:
                     insights.append(Insight(
@@ -314,23 +349,9 @@ class InsightsAI:
                         break
 
         # Prepare aggregates for heuristic gap-filler
-        # Recompute aggregates in-scope for this function
-        txs_agg = db.query(Transaction).filter(
-            Transaction.user_id == user_id,
-            Transaction.date >= start_date,
-            Transaction.date <= end_date,
-        ).all()
-        expense_by_category: Dict[str, float] = {}
-        expense_by_merchant: Dict[str, float] = {}
-        total_expense = 0.0
-        for t in txs_agg:
-            if float(t.amount) < 0:
-                cat = (t.primary_category or "Uncategorized")
-                m = (t.merchant_name or t.name) or "Unknown"
-                val = abs(float(t.amount))
-                expense_by_category[cat] = expense_by_category.get(cat, 0.0) + val
-                expense_by_merchant[m] = expense_by_merchant.get(m, 0.0) + val
-                total_expense += val
+        expense_by_category = frame.expense_by_category()
+        expense_by_merchant = frame.expense_by_merchant()
+        total_expense = frame.totals()["expense"]
 
         # Heuristic gap-filler: if a type is still under the minimum and there is room,
         # synthesize simple, accurate insights from aggregates so users see 3–7 per type.
@@ -411,26 +432,9 @@ class InsightsAI:
         db.query(Insight).filter(Insight.user_id == user_id, Insight.dismissed == False).delete(synchronize_session=False)  # noqa: E712
 
         # Enrich descriptions with period context and category deltas
-        last30_start = (datetime.utcnow() - timedelta(days=30)).date()
-        prev30_start = (datetime.utcnow() - timedelta(days=60)).date()
-        prev30_end = (datetime.utcnow() - timedelta(days=31)).date()
-        # Build category sums for last30 and prev30
-        cat_last30: Dict[str, float] = {}
-        cat_prev30: Dict[str, float] = {}
-        txs_last60 = db.query(Transaction).filter(
-            Transaction.user_id == user_id,
-            Transaction.date >= prev30_start,
-            Transaction.date <= end_date,
-        ).all()
-        for t in txs_last60:
-            if float(t.amount) >= 0:
-                continue
-            cat = (t.primary_category or "Uncategorized")
-            amt = abs(float(t.amount))
-            if t.date >= last30_start:
-                cat_last30[cat] = cat_last30.get(cat, 0.0) + amt
-            elif t.date <= prev30_end:
-                cat_prev30[cat] = cat_prev30.get(cat, 0.0) + amt
+        # Category expense sums for last30 and prev30
+        cat_last30: Dict[str, float] = frame.expense_by_category(where=snapshot.last_30d)
+        cat_prev30: Dict[str, float] = frame.expense_by_category(where=snapshot.prior_30d)
 
         for ins in picked:
             cat = ins.category or None
@@ -0,0 +1,183 @@
+import asyncio
+import concurrent.futures
+import os
+import random
+import threading
+import time
+from typing import Any, Coroutine, Dict, List, Optional
+
+
+# Shared Groq quota for this process. Batch (nightly) and interactive generation
+# both go through one gateway, so together they stay under the provider limits.
+GROQ_MAX_CONCURRENCY = int(os.getenv("GROQ_MAX_CONCURRENCY", "4"))
+GROQ_REQUESTS_PER_MINUTE = int(os.getenv("GROQ_REQUESTS_PER_MINUTE", "30"))
+GROQ_TOKENS_PER_MINUTE = int(os.getenv("GROQ_TOKENS_PER_MINUTE", "12000"))
+GROQ_TIMEOUT_SECONDS = float(os.getenv("GROQ_TIMEOUT_SECONDS", "60"))
+# Upper bound for one backoff sleep, however many attempts have failed
+GROQ_MAX_BACKOFF_SECONDS = float(os.getenv("GROQ_MAX_BACKOFF_SECONDS", "30"))
+
+
+class LLMGatewayError(Exception):
+    """The completion failed for good (non-retryable error or retries exhausted)."""
+
+
+class TokenBucket:
+    """Async token bucket refilled continuously at ``per_minute / 60`` tokens a second.
+
+    ``acquire`` waits (without blocking the event loop) until enough tokens
+    have accumulated; waiters are served in arrival order. A request larger
+    than the bucket is clamped to its capacity so it can still go through.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = max(1.0, float(per_minute))
+        self.rate = self.capacity / 60.0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        amount = min(float(amount), self.capacity)
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            self._refill()
+            while self._tokens < amount:
+                await asyncio.sleep((amount - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= amount
+
+    def refund(self, amount: float) -> None:
+        """Return tokens reserved up front but not used (negative to charge more)."""
+        self._refill()
+        self._tokens = min(self.capacity, self._tokens + amount)
+
+
+def _estimate_tokens(messages: List[Dict[str, str]], max_tokens: int) -> int:
+    # ~4 characters per token for English/JSON, plus the completion budget
+    return sum(len(m.get("content") or "") for m in messages) // 4 + max_tokens
+
+
+def _is_retryable(exc: Exception) -> bool:
+    import groq
+    if isinstance(exc, groq.APIConnectionError):  # includes timeouts
+        return True
+    if isinstance(exc, groq.APIStatusError):
+        return exc.status_code in (408, 409, 429) or exc.status_code >= 500
+    return False
+
+
+def _retry_after(exc: Exception) -> Optional[float]:
+    response = getattr(exc, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class LLMGateway:
+    """One AsyncGroq client on a background event loop, shared by the process.
+
+    Every completion takes a concurrency slot (semaphore) and its share of the
+    requests- and tokens-per-minute buckets, then retries transient failures
+    with exponential backoff and full jitter, honoring ``Retry-After``. Waits
+    and backoff are ``asyncio.sleep`` on the gateway loop, so many requests can
+    be pending at once without each holding a thread in a blocking sleep.
+    ``submit`` returns a ``concurrent.futures.Future`` so batch callers can
+    queue many completions without parking a thread on each; ``complete`` is
+    the blocking entry point for request handlers and single jobs.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str],
+        max_concurrency: int = GROQ_MAX_CONCURRENCY,
+        requests_per_minute: int = GROQ_REQUESTS_PER_MINUTE,
+        tokens_per_minute: int = GROQ_TOKENS_PER_MINUTE,
+    ):
+        self.api_key = api_key
+        self.max_concurrency = max(1, max_concurrency)
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self._client: Any = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="llm-gateway", daemon=True)
+        self._thread.start()
+
+    def _get_client(self) -> Any:
+        # created on the gateway loop and reused for every call
+        if self._client is None:
+            from groq import AsyncGroq
+            # retries are ours, so they respect the buckets
+            self._client = AsyncGroq(api_key=self.api_key, timeout=GROQ_TIMEOUT_SECONDS, max_retries=0)
+        return self._client
+
+    async def acomplete(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        retries: int = 3,
+        retry_delay: float = 1.0,
+    ) -> str:
+        """Return the completion text; raises LLMGatewayError when it gives up."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        estimate = _estimate_tokens(messages, max_tokens)
+        for attempt in range(retries + 1):
+            await self.requests.acquire(1)
+            await self.tokens.acquire(estimate)
+            try:
+                async with self._semaphore:
+                    completion = await self._get_client().chat.completions.create(
+                        model=model,
+                        messages=messages,
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                    )
+            except Exception as e:
+                if attempt == retries or not _is_retryable(e):
+                    raise LLMGatewayError(str(e)) from e
+                # the failed attempt used none of its token reservation
+                self.tokens.refund(estimate)
+                delay = random.uniform(0, min(GROQ_MAX_BACKOFF_SECONDS, retry_delay * (2 ** attempt)))
+                await asyncio.sleep(max(delay, _retry_after(e) or 0))
+                continue
+            usage = getattr(completion, "usage", None)
+            if usage is not None and usage.total_tokens:
+                self.tokens.refund(estimate - usage.total_tokens)
+            return completion.choices[0].message.content or ""
+        raise LLMGatewayError("no attempts made")
+
+    def run(self, coro: Coroutine[Any, Any, Any]) -> concurrent.futures.Future:
+        """Schedule a coroutine (typically awaiting ``acomplete``) on the gateway loop."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def submit(self, *args: Any, **kwargs: Any) -> concurrent.futures.Future:
+        """Queue ``acomplete`` without waiting; the future resolves to the text."""
+        return self.run(self.acomplete(*args, **kwargs))
+
+    def complete(self, *args: Any, **kwargs: Any) -> str:
+        """Blocking wrapper around ``acomplete`` for callers outside the loop."""
+        return self.submit(*args, **kwargs).result()
+
+
+_gateway: Optional[LLMGateway] = None
+_gateway_lock = threading.Lock()
+
+
+def get_llm_gateway() -> LLMGateway:
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = LLMGateway(os.getenv("GROQ_API_KEY"))
+    return _gateway
@@ -0,0 +1,76 @@
+import os
+import threading
+from typing import Optional
+
+from plaid.api import plaid_api
+from plaid.api_client import ApiClient
+from plaid.configuration import Configuration
+
+
+PLAID_CLIENT_ID = os.getenv("PLAID_CLIENT_ID")
+PLAID_SECRET = os.getenv("PLAID_SECRET")
+PLAID_ENV = os.getenv("PLAID_ENV", "sandbox")
+
+# Keep-alive connections held open to the Plaid host; size it to at least the
+# number of concurrent Plaid calls (e.g. PLAID_SYNC_MAX_WORKERS across requests)
+PLAID_POOL_MAXSIZE = int(os.getenv("PLAID_POOL_MAXSIZE", "20"))
+PLAID_CONNECT_TIMEOUT = float(os.getenv("PLAID_CONNECT_TIMEOUT", "5"))
+PLAID_READ_TIMEOUT = float(os.getenv("PLAID_READ_TIMEOUT", "60"))
+
+_PLAID_HOSTS = {
+    "sandbox": "https://sandbox.plaid.com",
+    "development": "https://development.plaid.com",
+}
+
+_client: Optional[plaid_api.PlaidApi] = None
+_client_lock = threading.Lock()
+
+
+class _TimeoutApiClient(ApiClient):
+    """ApiClient that applies default (connect, read) timeouts to every call."""
+
+    def __init__(self, configuration: Configuration, request_timeout: tuple):
+        super().__init__(configuration)
+        self._default_request_timeout = request_timeout
+
+    def request(self, *args, _request_timeout=None, **kwargs):
+        if _request_timeout is None:
+            _request_timeout = self._default_request_timeout
+        return super().request(*args, _request_timeout=_request_timeout, **kwargs)
+
+
+def _build_client() -> plaid_api.PlaidApi:
+    configuration = Configuration(
+        host=_PLAID_HOSTS.get(PLAID_ENV, "https://production.plaid.com"),
+        api_key={
+            'clientId': PLAID_CLIENT_ID,
+            'secret': PLAID_SECRET,
+        }
+    )
+    configuration.connection_pool_maxsize = PLAID_POOL_MAXSIZE
+    api_client = _TimeoutApiClient(configuration, (PLAID_CONNECT_TIMEOUT, PLAID_READ_TIMEOUT))
+    return plaid_api.PlaidApi(api_client)
+
+
+def get_plaid_client() -> plaid_api.PlaidApi:
+    """Return the process-wide Plaid client, creating it on first use.
+
+    Every route, service and background job should go through this so they
+    share one HTTP connection pool.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = _build_client()
+    return _client
+
+
+def set_plaid_client(client: Optional[plaid_api.PlaidApi]) -> None:
+    """Replace the shared client, e.g. with a local stand-in for benchmarks.
+
+    Passing ``None`` drops the override; the real client is rebuilt on next use.
+    """
+    global _client
+    with _client_lock:
+        _client = client
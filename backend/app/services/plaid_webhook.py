@@ -0,0 +1,89 @@
+import hashlib
+import hmac
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from jose import jwt
+from plaid.model.webhook_verification_key_get_request import WebhookVerificationKeyGetRequest
+from sqlalchemy.orm import Session
+
+from app.models import PlaidItem
+from app.services.plaid_client import get_plaid_client
+from app.tasks.job_queue import enqueue_job
+from app.tasks.sync_tasks import run_item_sync_job
+
+
+# Seconds a webhook-triggered sync waits before running; further webhooks for
+# the same item within the window coalesce into the pending sync
+WEBHOOK_DEBOUNCE_SECONDS = float(os.getenv("PLAID_WEBHOOK_DEBOUNCE_SECONDS", "30"))
+# Verify the Plaid-Verification JWT on incoming webhooks (disable only for local testing)
+WEBHOOK_VERIFY = os.getenv("PLAID_WEBHOOK_VERIFY", "true").lower() == "true"
+WEBHOOK_MAX_AGE_SECONDS = 5 * 60
+
+# TRANSACTIONS webhook codes that mean there is new data to pull
+SYNC_WEBHOOK_CODES = {
+    "SYNC_UPDATES_AVAILABLE",
+    "INITIAL_UPDATE",
+    "HISTORICAL_UPDATE",
+    "DEFAULT_UPDATE",
+    "TRANSACTIONS_REMOVED",
+}
+
+_verification_keys: Dict[str, Dict[str, Any]] = {}
+_verification_keys_lock = threading.Lock()
+
+
+def _get_verification_key(key_id: str) -> Dict[str, Any]:
+    with _verification_keys_lock:
+        key = _verification_keys.get(key_id)
+    if key is None:
+        resp = get_plaid_client().webhook_verification_key_get(WebhookVerificationKeyGetRequest(key_id=key_id))
+        key = resp['key'].to_dict()
+        with _verification_keys_lock:
+            _verification_keys[key_id] = key
+    return key
+
+
+def verify_webhook(body: bytes, verification_header: Optional[str]) -> bool:
+    """Check a webhook's Plaid-Verification JWT against the raw request body."""
+    if not WEBHOOK_VERIFY:
+        return True
+    if not verification_header:
+        return False
+    try:
+        header = jwt.get_unverified_header(verification_header)
+        if header.get("alg") != "ES256":
+            return False
+        key = _get_verification_key(header["kid"])
+        if key.get("expired_at"):
+            return False
+        claims = jwt.decode(verification_header, key, algorithms=["ES256"])
+    except Exception:
+        return False
+    if time.time() - float(claims.get("iat", 0)) > WEBHOOK_MAX_AGE_SECONDS:
+        return False
+    body_hash = hashlib.sha256(body).hexdigest()
+    return hmac.compare_digest(body_hash, str(claims.get("request_body_sha256", "")))
+
+
+def handle_transactions_webhook(payload: Dict[str, Any], db: Session) -> Dict[str, Any]:
+    """Schedule a debounced, item-scoped sync for a TRANSACTIONS webhook."""
+    if payload.get("webhook_type") != "TRANSACTIONS" or payload.get("webhook_code") not in SYNC_WEBHOOK_CODES:
+        return {"status": "ignored"}
+
+    item = db.query(PlaidItem).filter(PlaidItem.item_id == payload.get("item_id")).first()
+    if not item:
+        return {"status": "ignored"}
+
+    job = enqueue_job(
+        db,
+        "plaid_item_sync",
+        run_item_sync_job,
+        user_id=item.user_id,
+        dedupe_key=f"plaid_item_sync:{item.id}",
+        delay_seconds=WEBHOOK_DEBOUNCE_SECONDS,
+        plaid_item_id=item.id,
+    )
+    return {"status": "queued", "job_id": job.id}
@@ -0,0 +1,162 @@
+import abc
+import math
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, NamedTuple, Tuple
+
+from sqlalchemy import BigInteger, DateTime, Integer, String, delete, func, literal, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.database import engine
+from app.models import RateLimitCounter
+
+
+# "postgres" shares counters between every API worker and host through the
+# rate_limit_counters table; "memory" keeps them in this process (dev, tests).
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "postgres").lower()
+# Share of Postgres hits that also delete expired counter rows
+RATE_LIMIT_PURGE_PROBABILITY = 0.01
+# Added to the computed wait before rounding up, so a client retrying after
+# exactly Retry-After seconds is past the boundary despite float error in the
+# window weight
+_RETRY_AFTER_EPSILON_SECONDS = 1e-3
+
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    retry_after: int  # seconds until a request would be allowed; 0 when allowed
+
+
+def _window(now: float, window_seconds: int) -> Tuple[int, float]:
+    """Index of the fixed window containing ``now`` and how far into it we are (0-1)."""
+    position = now / window_seconds
+    index = int(position)
+    return index, position - index
+
+
+def _retry_after(previous: int, current: int, limit: int, window_seconds: int, elapsed: float) -> int:
+    """Whole seconds until ``previous * (1 - elapsed) + current + 1 <= limit`` holds."""
+    if current + 1 > limit:
+        # not before the next window, once enough of this one has slid out
+        wait = (1 - elapsed) + max(0.0, 1 - (limit - 1) / current)
+    else:
+        wait = (1 - (limit - current - 1) / previous) - elapsed
+    return max(1, math.ceil(wait * window_seconds + _RETRY_AFTER_EPSILON_SECONDS))
+
+
+class SlidingWindowRateLimiter(abc.ABC):
+    """At most ``limit`` hits per key in any ``window_seconds``-long window.
+
+    Sliding-window counter: each key keeps only the counts for the current and
+    the previous fixed window, and a hit is allowed while
+    ``previous * (1 - elapsed) + current < limit``, ``elapsed`` being the
+    fraction of the current window gone by. That is O(1) state per key, and a
+    key idle for a full window has nothing left to keep. Rejected hits are not
+    counted.
+    """
+
+    def __init__(self, name: str, limit: int, window_seconds: int):
+        self.name = name
+        self.limit = max(1, limit)
+        self.window_seconds = max(1, window_seconds)
+
+    @abc.abstractmethod
+    def hit(self, key: Any) -> RateLimitResult:
+        """Count a hit for ``key`` if it is within the limit."""
+
+
+class MemoryRateLimiter(SlidingWindowRateLimiter):
+    """Counters in this process; idle keys are evicted as time moves on."""
+
+    def __init__(self, name: str, limit: int, window_seconds: int):
+        super().__init__(name, limit, window_seconds)
+        # key -> [window index, current count, previous count], least recently hit first
+        self._counters: "OrderedDict[Any, List[int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._counters)
+
+    def hit(self, key: Any) -> RateLimitResult:
+        index, elapsed = _window(time.time(), self.window_seconds)
+        with self._lock:
+            # keys untouched since before the previous window no longer count for anything
+            while self._counters and next(iter(self._counters.values()))[0] < index - 1:
+                self._counters.popitem(last=False)
+
+            window_index, current, previous = self._counters.pop(key, (index, 0, 0))
+            if window_index == index - 1:
+                current, previous = 0, current
+            if previous * (1 - elapsed) + current + 1 <= self.limit:
+                self._counters[key] = [index, current + 1, previous]
+                return RateLimitResult(True, 0)
+            self._counters[key] = [index, current, previous]
+        return RateLimitResult(False, _retry_after(previous, current, self.limit, self.window_seconds, elapsed))
+
+
+class PostgresRateLimiter(SlidingWindowRateLimiter):
+    """Counters in rate_limit_counters, shared by every process using the database.
+
+    A hit is one conditional upsert: the row for the current window is created
+    or incremented only if the weighted estimate stays within the limit, so
+    concurrent hits from any worker can't overshoot it. Each hit runs in its
+    own short transaction, independent of the request's session.
+    """
+
+    def hit(self, key: Any) -> RateLimitResult:
+        key = f"{self.name}:{key}"
+        index, elapsed = _window(time.time(), self.window_seconds)
+        # a window matters until the one after it has ended
+        expires_at = datetime.fromtimestamp((index + 2) * self.window_seconds, tz=timezone.utc)
+
+        table = RateLimitCounter.__table__
+        prev = table.alias("prev")
+        previous = func.coalesce(
+            select(prev.c.count).where(prev.c.key == key, prev.c.window_index == index - 1).scalar_subquery(), 0
+        )
+        weighted = previous * (1 - elapsed)
+        stmt = pg_insert(table).from_select(
+            ["key", "window_index", "count", "expires_at"],
+            select(
+                literal(key, String),
+                literal(index, BigInteger),
+                literal(1, Integer),
+                literal(expires_at, DateTime(timezone=True)),
+            ).where(weighted + 1 <= self.limit),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["key", "window_index"],
+            set_={"count": table.c.count + 1},
+            where=weighted + table.c.count + 1 <= self.limit,
+        ).returning(table.c.count)
+
+        try:
+            with engine.begin() as conn:
+                if conn.execute(stmt).first() is not None:
+                    if random.random() < RATE_LIMIT_PURGE_PROBABILITY:
+                        conn.execute(delete(table).where(table.c.expires_at < func.now()))
+                    return RateLimitResult(True, 0)
+                counts: Dict[int, int] = dict(conn.execute(
+                    select(table.c.window_index, table.c.count)
+                    .where(table.c.key == key, table.c.window_index.in_((index - 1, index)))
+                ).all())
+        except SQLAlchemyError:
+            # fail open: a limiter outage shouldn't take the endpoint down with it
+            return RateLimitResult(True, 0)
+        return RateLimitResult(False, _retry_after(
+            counts.get(index - 1, 0), counts.get(index, 0), self.limit, self.window_seconds, elapsed
+        ))
+
+
+def get_rate_limiter(name: str, limit: int, window_seconds: int, backend: str = RATE_LIMIT_BACKEND) -> SlidingWindowRateLimiter:
+    """Limiter for ``name`` (used as the key prefix) on the configured backend."""
+    if backend == "memory":
+        return MemoryRateLimiter(name, limit, window_seconds)
+    if backend == "postgres":
+        return PostgresRateLimiter(name, limit, window_seconds)
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {backend}")
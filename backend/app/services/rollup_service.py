@@ -0,0 +1,209 @@
+import os
+from datetime import date
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models import DailyCategoryRollup, Transaction
+
+
+# Answer category aggregates (summary, budget spend, insights) from
+# daily_category_rollup instead of scanning transactions. Sync maintains the
+# rollup regardless, so this can be flipped at any time.
+DAILY_ROLLUP_ENABLED = os.getenv("DAILY_ROLLUP_ENABLED", "true").lower() == "true"
+
+UNCATEGORIZED = "Uncategorized"
+
+_RollupKey = Tuple[int, date, str]
+
+
+class RollupDelta:
+    """Accumulates the rollup changes caused by a batch of transaction writes.
+
+    Record the stored version of a transaction with ``remove`` and the version
+    being written with ``add``; a modified transaction (including one whose
+    sign, date or category changed) is simply both. ``apply`` then adjusts only
+    the affected (user, day, category) buckets in one statement.
+    """
+
+    def __init__(self):
+        self._buckets: Dict[_RollupKey, List[Any]] = {}
+
+    def _record(self, row: Any, sign: int) -> None:
+        if isinstance(row, dict):
+            user_id, tx_date, category, amount = row['user_id'], row['date'], row['primary_category'], row['amount']
+        else:
+            user_id, tx_date, category, amount = row.user_id, row.date, row.primary_category, row.amount
+        amount = Decimal(str(amount))
+        key = (user_id, tx_date, category or UNCATEGORIZED)
+        bucket = self._buckets.setdefault(key, [Decimal(0), Decimal(0), 0])
+        if amount > 0:
+            bucket[0] += sign * amount
+        elif amount < 0:
+            bucket[1] -= sign * amount
+        bucket[2] += sign
+
+    def add(self, row: Any) -> None:
+        self._record(row, 1)
+
+    def remove(self, row: Any) -> None:
+        self._record(row, -1)
+
+    def apply(self, db: Session) -> None:
+        """Write the accumulated deltas and reset. The caller commits."""
+        rows = [
+            {
+                "user_id": key[0],
+                "date": key[1],
+                "primary_category": key[2],
+                "income_sum": income,
+                "expense_sum": expense,
+                "tx_count": count,
+            }
+            # sorted so concurrent syncs for one user lock buckets in the same order
+            for key, (income, expense, count) in sorted(self._buckets.items())
+            if income or expense or count
+        ]
+        emptied = [key for key, (_, _, count) in self._buckets.items() if count < 0]
+        self._buckets = {}
+        if not rows:
+            return
+
+        table = DailyCategoryRollup.__table__
+        stmt = pg_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['user_id', 'date', 'primary_category'],
+            set_={
+                'income_sum': table.c.income_sum + stmt.excluded.income_sum,
+                'expense_sum': table.c.expense_sum + stmt.excluded.expense_sum,
+                'tx_count': table.c.tx_count + stmt.excluded.tx_count,
+            },
+        )
+        db.execute(stmt, rows)
+        if emptied:
+            # buckets that lost their last transaction
+            db.execute(delete(table).where(
+                tuple_(table.c.user_id, table.c.date, table.c.primary_category).in_(emptied),
+                table.c.tx_count <= 0,
+            ))
+
+
+def delta_for_upsert(
+    db: Session,
+    rows: List[Dict[str, Any]],
+    delta: Optional[RollupDelta] = None,
+) -> RollupDelta:
+    """Build the delta for upserting ``rows`` (keyed by plaid_transaction_id),
+    recording into ``delta`` when given.
+
+    Must be called before the rows are written: the stored version of any
+    transaction being overwritten is read here and backed out.
+    """
+    if delta is None:
+        delta = RollupDelta()
+    plaid_ids = [r['plaid_transaction_id'] for r in rows]
+    if plaid_ids:
+        stored = db.execute(
+            select(Transaction.user_id, Transaction.date, Transaction.primary_category, Transaction.amount)
+            .where(Transaction.plaid_transaction_id.in_(plaid_ids))
+        )
+        for row in stored:
+            delta.remove(row)
+    for row in rows:
+        delta.add(row)
+    return delta
+
+
+def rebuild_rollup_for_user(db: Session, user_id: int) -> None:
+    """Recompute a user's rollup from their transactions. The caller commits.
+
+    See ``app.tasks.rollup_tasks`` for the command-line repair.
+    """
+    db.query(DailyCategoryRollup).filter(DailyCategoryRollup.user_id == user_id).delete(synchronize_session=False)
+    category = func.coalesce(Transaction.primary_category, UNCATEGORIZED)
+    aggregates = select(
+        Transaction.user_id,
+        Transaction.date,
+        category,
+        func.coalesce(func.sum(Transaction.amount).filter(Transaction.amount > 0), 0),
+        func.coalesce(func.sum(-Transaction.amount).filter(Transaction.amount < 0), 0),
+        func.count(),
+    ).where(Transaction.user_id == user_id).group_by(Transaction.user_id, Transaction.date, category)
+    db.execute(pg_insert(DailyCategoryRollup.__table__).from_select(
+        ['user_id', 'date', 'primary_category', 'income_sum', 'expense_sum', 'tx_count'], aggregates
+    ))
+
+
+def category_totals(
+    db: Session,
+    user_id: int,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+) -> List[Any]:
+    """Income, expense magnitude and count per primary category for a period.
+
+    Rows carry ``category``, ``income``, ``expenses`` and ``count``, ordered by
+    category. Reads the rollup when DAILY_ROLLUP_ENABLED, otherwise groups the
+    raw transactions; both give the same numbers.
+    """
+    if DAILY_ROLLUP_ENABLED:
+        category = DailyCategoryRollup.primary_category
+        date_col = DailyCategoryRollup.date
+        query = db.query(
+            category.label("category"),
+            func.sum(DailyCategoryRollup.income_sum).label("income"),
+            func.sum(DailyCategoryRollup.expense_sum).label("expenses"),
+            func.sum(DailyCategoryRollup.tx_count).label("count"),
+        ).filter(DailyCategoryRollup.user_id == user_id)
+    else:
+        category = func.coalesce(Transaction.primary_category, UNCATEGORIZED)
+        date_col = Transaction.date
+        query = db.query(
+            category.label("category"),
+            func.coalesce(func.sum(Transaction.amount).filter(Transaction.amount > 0), 0).label("income"),
+            func.coalesce(func.sum(-Transaction.amount).filter(Transaction.amount < 0), 0).label("expenses"),
+            func.count(Transaction.id).label("count"),
+        ).filter(Transaction.user_id == user_id)
+    if start_date:
+        query = query.filter(date_col >= start_date)
+    if end_date:
+        query = query.filter(date_col <= end_date)
+    return query.group_by(category).order_by(category).all()
+
+
+def expense_totals_for_windows(
+    db: Session,
+    user_id: int,
+    windows: List[Tuple[str, date, date]],
+) -> List[float]:
+    """Expense magnitude for each (category, start_date, end_date) window.
+
+    All windows are answered by one query with a conditional SUM per window,
+    scanning only the union of their date ranges. Results are in input order.
+    """
+    if not windows:
+        return []
+    if DAILY_ROLLUP_ENABLED:
+        category = DailyCategoryRollup.primary_category
+        date_col = DailyCategoryRollup.date
+        expense = DailyCategoryRollup.expense_sum
+        query = db.query().select_from(DailyCategoryRollup).filter(DailyCategoryRollup.user_id == user_id)
+    else:
+        category = func.coalesce(Transaction.primary_category, UNCATEGORIZED)
+        date_col = Transaction.date
+        expense = -Transaction.amount
+        query = db.query().select_from(Transaction).filter(Transaction.user_id == user_id, Transaction.amount < 0)
+
+    sums = [
+        func.coalesce(func.sum(expense).filter(category == cat, date_col >= start, date_col <= end), 0)
+        for cat, start, end in windows
+    ]
+    row = query.add_columns(*sums).filter(
+        category.in_({cat for cat, _, _ in windows}),
+        date_col >= min(start for _, start, _ in windows),
+        date_col <= max(end for _, _, end in windows),
+    ).one()
+    return [float(value) for value in row]
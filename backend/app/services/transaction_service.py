@@ -1,38 +1,53 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from sqlalchemy import delete, func, literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta, date
-from typing import Tuple, Dict, Any, List, Optional
+from typing import Tuple, Dict, Any, Iterator, List, Optional
 
-from app.models import PlaidItem, Account, Transaction
+from app.database import SessionLocal
+from app.models import PlaidItem, Transaction
+from app.services.budget_service import invalidate_budget_cache
+from app.services.plaid_client import get_plaid_client
+from app.services.rollup_service import RollupDelta, category_totals, delta_for_upsert
 
-from plaid.api import plaid_api
+import plaid
 from plaid.model.transactions_get_request import TransactionsGetRequest
 from plaid.model.transactions_get_request_options import TransactionsGetRequestOptions
-from plaid.model.country_code import CountryCode
-from plaid.configuration import Configuration
-from plaid.api_client import ApiClient
+from plaid.model.transactions_sync_request import TransactionsSyncRequest
+from plaid.model.transactions_sync_request_options import TransactionsSyncRequestOptions
+import json
 import os
 
-
-PLAID_CLIENT_ID = os.getenv("PLAID_CLIENT_ID")
-PLAID_SECRET = os.getenv("PLAID_SECRET")
-PLAID_ENV = os.getenv("PLAID_ENV", "sandbox")
-
-if PLAID_ENV == "sandbox":
-    host_url = "https://sandbox.plaid.com"
-elif PLAID_ENV == "development":
-    host_url = "https://development.plaid.com"
-else:
-    host_url = "https://production.plaid.com"
-
-configuration = Configuration(
-    host=host_url,
-    api_key={
-        'clientId': PLAID_CLIENT_ID,
-        'secret': PLAID_SECRET,
-    }
+logger = logging.getLogger(__name__)
+
+# Rows written per INSERT ... ON CONFLICT statement and committed per transaction
+SYNC_CHUNK_SIZE = int(os.getenv("PLAID_SYNC_CHUNK_SIZE", "1000"))
+
+# Page size for /transactions/get and /transactions/sync (Plaid allows up to 500),
+# and how often to restart a /transactions/sync pagination loop that Plaid aborts
+# because the item changed underneath it
+SYNC_PAGE_SIZE = int(os.getenv("PLAID_SYNC_PAGE_SIZE", "500"))
+SYNC_MUTATION_RETRIES = int(os.getenv("PLAID_SYNC_MUTATION_RETRIES", "3"))
+
+# Upper bound on Plaid items synced in parallel for one user. Every worker holds
+# its own session, so JOB_WORKERS * PLAID_SYNC_MAX_WORKERS (plus request
+# traffic) must fit in the pool: DB_POOL_SIZE + DB_MAX_OVERFLOW in app.database.
+SYNC_MAX_WORKERS = int(os.getenv("PLAID_SYNC_MAX_WORKERS", "4"))
+
+# Columns refreshed from Plaid when a transaction already exists (notes are user-owned)
+_UPSERT_UPDATE_COLUMNS = (
+    'user_id',
+    'account_id',
+    'amount',
+    'date',
+    'name',
+    'merchant_name',
+    'category',
+    'primary_category',
+    'pending',
 )
-api_client = ApiClient(configuration)
-plaid_client = plaid_api.PlaidApi(api_client)
 
 
 def _extract_primary_category(category_list: Optional[List[str]]) -> Optional[str]:
@@ -41,130 +56,418 @@ def _extract_primary_category(category_list: Optional[List[str]]) -> Optional[st
     return category_list[0]
 
 
-def sync_transactions_for_user(user_id: int, db: Session) -> Dict[str, int]:
-    """Sync last 90 days of transactions for all Plaid items belonging to the user.
+def _normalize_transaction(tr: Any, user_id: int, account_id: int) -> Dict[str, Any]:
+    """Map a Plaid transaction onto the column values we store for it."""
+    amount = float(tr['amount'])
+    # Plaid: positive is expense; store expenses as negative
+    amount_to_store = -amount
 
-    Returns a dict with counts of new and updated transactions.
-    """
-    start_date: date = (datetime.now() - timedelta(days=90)).date()
-    end_date: date = datetime.now().date()
+    # Use Plaid Personal Finance Category when present (supports dict and SDK objects)
+    pfc = tr.get('personal_finance_category')
+    primary_category = None
+    categories = tr.get('category')
+    if pfc is not None:
+        try:
+            primary_val = pfc.get('primary') if hasattr(pfc, 'get') else getattr(pfc, 'primary', None)
+        except Exception:
+            primary_val = getattr(pfc, 'primary', None)
+        try:
+            detailed_val = pfc.get('detailed') if hasattr(pfc, 'get') else getattr(pfc, 'detailed', None)
+        except Exception:
+            detailed_val = getattr(pfc, 'detailed', None)
+
+        primary_category = primary_val or None
+        detailed = detailed_val or None
+        categories = [c for c in [primary_category, detailed] if c]
+
+    # Coerce categories to clean list[str]
+    if categories is None:
+        categories = []
+    try:
+        categories = [str(c) for c in categories if c]
+    except Exception:
+        categories = []
+    if not primary_category:
+        primary_category = categories[0] if categories else None
 
-    items: List[PlaidItem] = db.query(PlaidItem).filter(PlaidItem.user_id == user_id).all()
+    return {
+        'user_id': user_id,
+        'account_id': account_id,
+        'plaid_transaction_id': tr['transaction_id'],
+        'amount': amount_to_store,
+        'date': tr['date'],
+        'name': tr['name'],
+        'merchant_name': tr.get('merchant_name'),
+        'category': categories,
+        'primary_category': primary_category or _extract_primary_category(categories),
+        'pending': tr.get('pending', False),
+    }
+
+
+def _upsert_transactions_per_row(
+    db: Session,
+    rows: List[Dict[str, Any]],
+    delta: Optional[RollupDelta] = None,
+) -> Tuple[int, int]:
+    """Upsert rows one at a time through the ORM (one SELECT per row).
 
+    Kept for comparison with the bulk path; returns (created, updated). The
+    rollup changes are recorded into ``delta`` for the caller to apply when
+    given, otherwise applied here.
+    """
+    # a page replayed after a sync restart repeats transactions; count each once
+    rows = list({r['plaid_transaction_id']: r for r in rows}.values())
+    apply_delta = delta is None
+    delta = delta_for_upsert(db, rows, delta)
     num_created = 0
     num_updated = 0
+    for fields in rows:
+        existing: Optional[Transaction] = db.query(Transaction).filter(
+            Transaction.plaid_transaction_id == fields['plaid_transaction_id']
+        ).first()
+        if existing:
+            for k, v in fields.items():
+                setattr(existing, k, v)
+            num_updated += 1
+        else:
+            db.add(Transaction(**fields))
+            num_created += 1
+    if apply_delta:
+        delta.apply(db)
+    return num_created, num_updated
+
+
+def _bulk_upsert_transactions(
+    db: Session,
+    rows: List[Dict[str, Any]],
+    chunk_size: int = SYNC_CHUNK_SIZE,
+    delta: Optional[RollupDelta] = None,
+) -> Tuple[int, int]:
+    """Upsert rows with ``INSERT ... ON CONFLICT (plaid_transaction_id) DO UPDATE``.
+
+    Writes ``chunk_size`` rows per statement and returns (created, updated).
+    Postgres reports ``xmax = 0`` for freshly inserted tuples, which is how the
+    two counts are told apart. The daily rollup is adjusted in the same
+    transaction: per statement, or, with ``delta``, recorded there for the
+    caller to apply once.
+    """
+    # ON CONFLICT DO UPDATE cannot touch the same row twice in one statement,
+    # so keep only the last version of each Plaid transaction in the batch.
+    deduped = list({r['plaid_transaction_id']: r for r in rows}.values())
+
+    stmt = pg_insert(Transaction.__table__)
+    update_cols = {k: stmt.excluded[k] for k in _UPSERT_UPDATE_COLUMNS}
+    update_cols['updated_at'] = func.now()
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['plaid_transaction_id'],
+        set_=update_cols,
+    ).returning(literal_column("(xmax = 0)").label("inserted"))
+
+    num_created = 0
+    num_updated = 0
+    for i in range(0, len(deduped), chunk_size):
+        chunk = deduped[i:i + chunk_size]
+        chunk_delta = delta_for_upsert(db, chunk, delta)
+        inserted_flags = db.execute(
+            stmt, chunk, execution_options={"insertmanyvalues_page_size": chunk_size}
+        ).scalars().all()
+        created = sum(1 for flag in inserted_flags if flag)
+        num_created += created
+        num_updated += len(inserted_flags) - created
+        if delta is None:
+            chunk_delta.apply(db)
+    return num_created, num_updated
+
+
+def _iter_transactions_get_pages(
+    access_token: str,
+    start_date: date,
+    end_date: date,
+    page_size: int = SYNC_PAGE_SIZE,
+) -> Iterator[Dict[str, Any]]:
+    """Yield ``/transactions/get`` pages for a date range using count/offset."""
+    offset = 0
+    while True:
+        req = TransactionsGetRequest(
+            access_token=access_token,
+            start_date=start_date,
+            end_date=end_date,
+            options=TransactionsGetRequestOptions(
+                include_personal_finance_category=True,
+                count=page_size,
+                offset=offset,
+            ),
+        )
+        resp = get_plaid_client().transactions_get(req)
+        transactions = resp['transactions']
+        if not transactions:
+            return
+        yield {'upserts': transactions, 'removed': [], 'next_cursor': None}
+        offset += len(transactions)
+        if offset >= resp['total_transactions']:
+            return
+
+
+def _plaid_error_code(exc: plaid.ApiException) -> Optional[str]:
+    try:
+        return json.loads(exc.body or "{}").get("error_code")
+    except (TypeError, ValueError):
+        return None
 
-    for item in items:
+
+def _iter_transactions_sync_pages(
+    access_token: str,
+    cursor: Optional[str],
+    page_size: int = SYNC_PAGE_SIZE,
+) -> Iterator[Dict[str, Any]]:
+    """Yield ``/transactions/sync`` pages after ``cursor``.
+
+    Per Plaid's guidance pagination restarts from the original cursor if the
+    item changes mid-pagination, so pages may be yielded again; applying them
+    is idempotent.
+    """
+    attempt = 0
+    next_cursor = cursor
+    while True:
+        req_kwargs: Dict[str, Any] = {
+            'access_token': access_token,
+            'count': page_size,
+            'options': TransactionsSyncRequestOptions(include_personal_finance_category=True),
+        }
+        if next_cursor:
+            req_kwargs['cursor'] = next_cursor
         try:
-            req = TransactionsGetRequest(
-                access_token=item.access_token,
-                start_date=start_date,
-                end_date=end_date,
-                options=TransactionsGetRequestOptions(
-                    include_personal_finance_category=True
-                ),
-            )
-            resp = plaid_client.transactions_get(req)
-
-            accounts_by_plaid_id: Dict[str, Account] = {a.account_id: a for a in item.accounts}
-
-            for tr in resp['transactions']:
-                plaid_tx_id = tr['transaction_id']
-                plaid_account_id = tr['account_id']
-                account = accounts_by_plaid_id.get(plaid_account_id)
-                if not account:
-                    continue
-
-                existing: Optional[Transaction] = db.query(Transaction).filter(
-                    Transaction.plaid_transaction_id == plaid_tx_id
-                ).first()
-
-                amount = float(tr['amount'])
-                # Plaid: positive is expense; store expenses as negative
-                amount_to_store = -amount
-
-                # Use Plaid Personal Finance Category when present (supports dict and SDK objects)
-                pfc = tr.get('personal_finance_category')
-                primary_category = None
-                categories = tr.get('category')
-                if pfc is not None:
-                    try:
-                        primary_val = pfc.get('primary') if hasattr(pfc, 'get') else getattr(pfc, 'primary', None)
-                    except Exception:
-                        primary_val = getattr(pfc, 'primary', None)
-                    try:
-                        detailed_val = pfc.get('detailed') if hasattr(pfc, 'get') else getattr(pfc, 'detailed', None)
-                    except Exception:
-                        detailed_val = getattr(pfc, 'detailed', None)
-
-                    primary_category = primary_val or None
-                    detailed = detailed_val or None
-                    categories = [c for c in [primary_category, detailed] if c]
-
-                # Coerce categories to clean list[str]
-                if categories is None:
-                    categories = []
-                try:
-                    categories = [str(c) for c in categories if c]
-                except Exception:
-                    categories = []
-                if not primary_category:
-                    primary_category = categories[0] if categories else None
-
-                fields = {
-                    'user_id': user_id,
-                    'account_id': account.id,
-                    'plaid_transaction_id': plaid_tx_id,
-                    'amount': amount_to_store,
-                    'date': tr['date'],
-                    'name': tr['name'],
-                    'merchant_name': tr.get('merchant_name'),
-                    'category': categories,
-                    'primary_category': primary_category or _extract_primary_category(categories),
-                    'pending': tr.get('pending', False),
-                }
-
-                if existing:
-                    for k, v in fields.items():
-                        setattr(existing, k, v)
-                    num_updated += 1
-                else:
-                    tx = Transaction(**fields)
-                    db.add(tx)
-                    num_created += 1
+            resp = get_plaid_client().transactions_sync(TransactionsSyncRequest(**req_kwargs))
+        except plaid.ApiException as e:
+            if _plaid_error_code(e) == 'TRANSACTIONS_SYNC_MUTATION_DURING_PAGINATION' and attempt < SYNC_MUTATION_RETRIES:
+                attempt += 1
+                next_cursor = cursor
+                continue
+            raise
+        yield {
+            'upserts': list(resp['added']) + list(resp['modified']),
+            'removed': [r['transaction_id'] for r in resp['removed']],
+            'next_cursor': resp['next_cursor'],
+        }
+        if not resp['has_more']:
+            return
+        next_cursor = resp['next_cursor']
+
+
+def _rows_for_item(plaid_txs: List[Any], user_id: int, account_ids: Dict[str, int]) -> List[Dict[str, Any]]:
+    """Normalize Plaid transactions, dropping any for accounts we don't track."""
+    rows: List[Dict[str, Any]] = []
+    for tr in plaid_txs:
+        account_id = account_ids.get(tr['account_id'])
+        if account_id is None:
+            continue
+        rows.append(_normalize_transaction(tr, user_id, account_id))
+    return rows
+
+
+def _lock_item(db: Session, item_id: int) -> Optional[PlaidItem]:
+    return db.query(PlaidItem).filter(PlaidItem.id == item_id).with_for_update().first()
+
+
+def sync_transactions_for_item(
+    item_id: int,
+    db: Session,
+    bulk: bool = True,
+    incremental: bool = True,
+    chunk_size: Optional[int] = None,
+) -> Dict[str, int]:
+    """Sync a single Plaid item, streaming Plaid pages into fixed-size commits.
+
+    Pages are consumed lazily and written ``chunk_size`` rows at a time
+    (default ``PLAID_SYNC_CHUNK_SIZE``), each chunk in its own transaction, so
+    memory stays flat regardless of how much history the item has. Every chunk
+    transaction holds the item row lock, which keeps overlapping syncs of the
+    same item from interleaving their writes. In incremental mode the cursor is
+    only advanced after the last page has been applied.
 
+    On failure the current chunk is rolled back and the exception re-raised.
+    """
+    chunk_size = chunk_size or SYNC_CHUNK_SIZE
+    item = _lock_item(db, item_id)
+    if not item:
+        db.rollback()
+        return {"created": 0, "updated": 0, "removed": 0}
+
+    user_id = item.user_id
+    account_ids: Dict[str, int] = {a.account_id: a.id for a in item.accounts}
+    next_cursor = item.transactions_cursor
+    if incremental:
+        pages = _iter_transactions_sync_pages(item.access_token, next_cursor)
+    else:
+        start_date: date = (datetime.now() - timedelta(days=90)).date()
+        end_date: date = datetime.now().date()
+        pages = _iter_transactions_get_pages(item.access_token, start_date, end_date)
+
+    counts = {"created": 0, "updated": 0, "removed": 0}
+
+    def _write(rows: List[Dict[str, Any]], removed_ids: List[str]) -> None:
+        # One rollup statement per chunk transaction: its buckets are locked in
+        # sorted order, so parallel syncs of a user's items can't deadlock on them.
+        delta = RollupDelta()
+        if rows:
+            if bulk:
+                created, updated = _bulk_upsert_transactions(db, rows, chunk_size, delta)
+            else:
+                created, updated = _upsert_transactions_per_row(db, rows, delta)
+            counts["created"] += created
+            counts["updated"] += updated
+        if removed_ids:
+            deleted = db.execute(
+                delete(Transaction.__table__)
+                .where(
+                    Transaction.user_id == user_id,
+                    Transaction.plaid_transaction_id.in_(removed_ids),
+                )
+                .returning(Transaction.user_id, Transaction.date, Transaction.primary_category, Transaction.amount)
+            ).all()
+            for row in deleted:
+                delta.remove(row)
+            counts["removed"] += len(deleted)
+        delta.apply(db)
+
+    try:
+        rows: List[Dict[str, Any]] = []
+        removed: List[str] = []
+        for page in pages:
+            rows.extend(_rows_for_item(page['upserts'], user_id, account_ids))
+            removed.extend(page['removed'])
+            if page['next_cursor']:
+                next_cursor = page['next_cursor']
+            while len(rows) + len(removed) >= chunk_size:
+                chunk_rows, rows = rows[:chunk_size], rows[chunk_size:]
+                chunk_removed, removed = removed[:chunk_size - len(chunk_rows)], removed[chunk_size - len(chunk_rows):]
+                _write(chunk_rows, chunk_removed)
+                db.commit()
+                item = _lock_item(db, item_id)
+        _write(rows, removed)
+        if item is not None:
+            if incremental:
+                item.transactions_cursor = next_cursor
+            item.transactions_synced_at = func.now()
+        db.commit()
+    except Exception:
+        db.rollback()
+        # earlier chunks may already be committed
+        if any(counts.values()):
+            invalidate_budget_cache(db, user_id)
             db.commit()
-        except Exception:
-            db.rollback()
-            continue
+        raise
+    if any(counts.values()):
+        invalidate_budget_cache(db, user_id)
+        db.commit()
+    return counts
+
+
+def _sync_item_in_new_session(
+    item_id: int,
+    bulk: bool,
+    incremental: bool,
+    chunk_size: Optional[int],
+) -> Dict[str, int]:
+    db = SessionLocal()
+    try:
+        return sync_transactions_for_item(item_id, db, bulk=bulk, incremental=incremental, chunk_size=chunk_size)
+    finally:
+        db.close()
+
+
+def sync_transactions_for_user(
+    user_id: int,
+    db: Session,
+    bulk: bool = True,
+    incremental: bool = True,
+    max_workers: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+    synced_before: Optional[datetime] = None,
+) -> Dict[str, int]:
+    """Sync transactions for all Plaid items belonging to the user.
+
+    By default each item is synced incrementally from its stored
+    ``/transactions/sync`` cursor, applying only added, modified and removed
+    transactions. With ``incremental=False`` the last 90 days are re-fetched
+    with ``/transactions/get``; ``bulk`` then picks between the batched upsert
+    and the per-row path.
+
+    Items are synced in parallel on up to ``max_workers`` threads (default
+    ``PLAID_SYNC_MAX_WORKERS``), each with its own session and transaction. A
+    failing item is skipped without affecting the others. With a single worker
+    or a single item everything runs inline on ``db``. ``chunk_size`` bounds the
+    rows written per transaction (see ``sync_transactions_for_item``). With
+    ``synced_before`` only items not synced since then are synced.
+
+    Returns a dict with counts of new, updated and removed transactions and
+    of ``items`` attempted. An item that fails is logged and skipped;
+    ``failed`` counts those items and ``failed_item_ids`` lists them.
+    """
+    query = db.query(PlaidItem.id).filter(PlaidItem.user_id == user_id)
+    if synced_before is not None:
+        query = query.filter(
+            (PlaidItem.transactions_synced_at.is_(None)) | (PlaidItem.transactions_synced_at < synced_before)
+        )
+    item_ids: List[int] = [row.id for row in query.order_by(PlaidItem.id).all()]
+    workers = SYNC_MAX_WORKERS if max_workers is None else max_workers
+    workers = max(1, min(workers, len(item_ids)))
+    if workers > 1:
+        # the items run on their own sessions; don't hold this connection idle
+        # in a transaction for the whole fan-out
+        db.rollback()
+
+    totals: Dict[str, Any] = {
+        "created": 0, "updated": 0, "removed": 0, "items": len(item_ids), "failed": 0, "failed_item_ids": [],
+    }
 
-    return {"created": num_created, "updated": num_updated}
+    def _add(counts: Dict[str, int]) -> None:
+        for k, v in counts.items():
+            totals[k] += v
+
+    def _fail(item_id: int) -> None:
+        logger.exception("Transaction sync failed for plaid item %s", item_id)
+        totals["failed"] += 1
+        totals["failed_item_ids"].append(item_id)
+
+    if workers == 1:
+        for item_id in item_ids:
+            try:
+                _add(sync_transactions_for_item(
+                    item_id, db, bulk=bulk, incremental=incremental, chunk_size=chunk_size
+                ))
+            except Exception:
+                _fail(item_id)
+        return totals
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="plaid-sync") as pool:
+        futures = {
+            pool.submit(_sync_item_in_new_session, item_id, bulk, incremental, chunk_size): item_id
+            for item_id in item_ids
+        }
+        for future in as_completed(futures):
+            try:
+                _add(future.result())
+            except Exception:
+                _fail(futures[future])
+
+    return totals
 
 
 def get_transaction_summary(user_id: int, db: Session, start_date: Optional[date] = None, end_date: Optional[date] = None) -> Dict[str, Any]:
-    """Aggregate totals by income/expense and category for a period."""
-    query = db.query(Transaction).filter(Transaction.user_id == user_id)
-    if start_date:
-        query = query.filter(Transaction.date >= start_date)
-    if end_date:
-        query = query.filter(Transaction.date <= end_date)
-
-    txs: List[Transaction] = query.all()
-    total_income = sum(t.amount for t in txs if t.amount > 0)
-    total_expenses = sum(-t.amount for t in txs if t.amount < 0)
-    net_savings = total_income - total_expenses
-
-    by_category: Dict[str, float] = {}
-    for t in txs:
-        cat = t.primary_category or "Uncategorized"
-        by_category[cat] = by_category.get(cat, 0.0) + float(t.amount)
+    """Aggregate totals by income/expense and category for a period.
+
+    Only per-category scalars leave the database (see ``category_totals``);
+    overall totals are summed from those rows.
+    """
+    groups = category_totals(db, user_id, start_date, end_date)
+    total_income = sum(float(g.income) for g in groups)
+    total_expenses = sum(float(g.expenses) for g in groups)
 
     return {
-        "total_income": float(total_income),
-        "total_expenses": float(total_expenses),
-        "net_savings": float(net_savings),
-        "transaction_count": len(txs),
-        "by_category": [{"category": k, "amount": float(v)} for k, v in by_category.items()],
+        "total_income": total_income,
+        "total_expenses": total_expenses,
+        "net_savings": total_income - total_expenses,
+        "transaction_count": sum(int(g.count) for g in groups),
+        "by_category": [{"category": g.category, "amount": float(g.income) - float(g.expenses)} for g in groups],
     }
-
-
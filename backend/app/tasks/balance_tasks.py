@@ -0,0 +1,66 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List
+
+from plaid.model.accounts_get_request import AccountsGetRequest
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models import PlaidItem
+from app.services.account_service import upsert_accounts
+from app.services.plaid_client import get_plaid_client
+from app.tasks.job_queue import ProgressReporter
+
+
+BALANCE_REFRESH_INTERVAL_MINUTES = int(os.getenv("BALANCE_REFRESH_INTERVAL_MINUTES", "60"))
+# Plaid items refreshed in parallel; each worker holds a DB session while it runs
+BALANCE_REFRESH_MAX_WORKERS = int(os.getenv("BALANCE_REFRESH_MAX_WORKERS", "4"))
+
+
+def refresh_item_balances(plaid_item_id: int) -> Dict[str, int]:
+    """Pull accounts for one item and write their balances in one batched UPDATE."""
+    db = SessionLocal()
+    try:
+        item = db.query(PlaidItem).filter(PlaidItem.id == plaid_item_id).first()
+        if not item:
+            return {"created": 0, "updated": 0}
+        response = get_plaid_client().accounts_get(AccountsGetRequest(access_token=item.access_token))
+        counts = upsert_accounts(db, item, response['accounts'])
+        db.commit()
+        return counts
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def refresh_all_balances() -> Dict[str, int]:
+    """Scheduled job: refresh balances for every Plaid item with bounded concurrency."""
+    db = SessionLocal()
+    try:
+        item_ids: List[int] = [row.id for row in db.query(PlaidItem.id).order_by(PlaidItem.id)]
+    finally:
+        db.close()
+
+    totals = {"items": 0, "failed": 0, "created": 0, "updated": 0}
+    if not item_ids:
+        return totals
+    with ThreadPoolExecutor(max_workers=BALANCE_REFRESH_MAX_WORKERS, thread_name_prefix="balance-refresh") as pool:
+        futures = [pool.submit(refresh_item_balances, item_id) for item_id in item_ids]
+        for future in as_completed(futures):
+            try:
+                counts = future.result()
+            except Exception:
+                totals["failed"] += 1
+                continue
+            totals["items"] += 1
+            totals["created"] += counts["created"]
+            totals["updated"] += counts["updated"]
+    return totals
+
+
+def run_balance_refresh_job(db: Session, report: ProgressReporter) -> Dict[str, Any]:
+    """Background job wrapper for the scheduled refresh (items use their own sessions)."""
+    report(0, "Refreshing balances")
+    return refresh_all_balances()
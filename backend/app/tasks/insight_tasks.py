@@ -1,27 +1,169 @@
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Tuple
+
 from apscheduler.schedulers.background import BackgroundScheduler
-from datetime import time
+from sqlalchemy.orm import Session
+
 from app.database import SessionLocal
+from app.services.analytics import InsightSnapshot
 from app.services.insights_service import InsightsAI
 from app.models import User
+from app.tasks.balance_tasks import BALANCE_REFRESH_INTERVAL_MINUTES, run_balance_refresh_job
+from app.tasks.job_queue import ProgressReporter, enqueue_scheduled_job
 
 
+# Users whose insights are generated in parallel; each worker holds a DB session
+# and mostly waits on Groq, so this bounds both connections and LLM concurrency.
+INSIGHTS_MAX_WORKERS = int(os.getenv("INSIGHTS_MAX_WORKERS", "4"))
+# User ids read per query while walking the users table
+INSIGHTS_BATCH_SIZE = int(os.getenv("INSIGHTS_BATCH_SIZE", "200"))
+# Split the nightly run across processes/hosts: this one handles the users with
+# user_id % INSIGHTS_SHARD_COUNT == INSIGHTS_SHARD_INDEX.
+INSIGHTS_SHARD_COUNT = int(os.getenv("INSIGHTS_SHARD_COUNT", "1"))
+INSIGHTS_SHARD_INDEX = int(os.getenv("INSIGHTS_SHARD_INDEX", "0"))
+if INSIGHTS_SHARD_COUNT < 1 or not 0 <= INSIGHTS_SHARD_INDEX < INSIGHTS_SHARD_COUNT:
+    # a bad pair would silently skip every user (or divide by zero) each night
+    raise ValueError(
+        f"INSIGHTS_SHARD_INDEX must be in [0, INSIGHTS_SHARD_COUNT) and INSIGHTS_SHARD_COUNT >= 1; "
+        f"got {INSIGHTS_SHARD_INDEX}/{INSIGHTS_SHARD_COUNT}"
+    )
+
 _scheduler: BackgroundScheduler | None = None
 
 
-def _job_generate_all_users():
+def _shard_filter(query, shard_index: int, shard_count: int):
+    if shard_count > 1:
+        query = query.filter(User.id % shard_count == shard_index)
+    return query
+
+
+def _iter_user_id_batches(db: Session, shard_index: int, shard_count: int, batch_size: int) -> Iterator[List[int]]:
+    """Yield this shard's user ids in ascending batches, one keyset query each."""
+    last_id = 0
+    while True:
+        query = _shard_filter(db.query(User.id).filter(User.id > last_id), shard_index, shard_count)
+        batch = [row.id for row in query.order_by(User.id).limit(batch_size)]
+        db.rollback()  # don't hold a snapshot open while the batch runs
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1]
+
+
+def _prepare_user(ai: InsightsAI, user_id: int) -> Tuple[InsightSnapshot, Future]:
+    """Read the user's snapshot and start their Groq call; doesn't wait for it."""
+    db = SessionLocal()
+    try:
+        snapshot, prompt = ai.prepare_insights(user_id, db)
+    finally:
+        db.close()
+    return snapshot, ai.submit_groq(prompt)
+
+
+def _save_user(ai: InsightsAI, user_id: int, snapshot: InsightSnapshot, ai_results: List[Dict[str, Any]]) -> int:
     db = SessionLocal()
     try:
-        ai = InsightsAI()
-        users = db.query(User).all()
-        for u in users:
-            try:
-                ai.generate_insights_for_user(u.id, db)
-            except Exception:
-                continue
+        return len(ai.save_insights(user_id, db, snapshot, ai_results))
+    except Exception:
+        db.rollback()
+        raise
     finally:
         db.close()
 
 
+def run_nightly_insights_job(
+    db: Session,
+    report: ProgressReporter,
+    shard_index: int = 0,
+    shard_count: int = 1,
+) -> Dict[str, Any]:
+    """Background job: generate insights for every user in the shard.
+
+    User ids are streamed in batches. For each batch the pool threads read the
+    users' data and queue their Groq calls with the LLM gateway, then save each
+    user's insights as their call completes; no thread waits on the gateway's
+    rate limits. The returned dict (stored on the job row) records the run's
+    throughput.
+    """
+    ai = InsightsAI()
+    total = _shard_filter(db.query(User.id), shard_index, shard_count).count()
+    counts = {"users": 0, "failed": 0, "insights": 0}
+    started = time.perf_counter()
+    report(0, f"Generating insights for {total} users")
+    with ThreadPoolExecutor(max_workers=INSIGHTS_MAX_WORKERS, thread_name_prefix="insights") as pool:
+        for batch in _iter_user_id_batches(db, shard_index, shard_count, INSIGHTS_BATCH_SIZE):
+            prepared = {pool.submit(_prepare_user, ai, user_id): user_id for user_id in batch}
+            calls: Dict[Future, Tuple[int, InsightSnapshot]] = {}
+            for future in as_completed(prepared):
+                try:
+                    snapshot, call = future.result()
+                except Exception:
+                    counts["failed"] += 1
+                    continue
+                calls[call] = (prepared[future], snapshot)
+
+            saves = []
+            for call in as_completed(calls):
+                user_id, snapshot = calls[call]
+                try:
+                    ai_results = call.result()
+                except Exception:
+                    ai_results = []  # heuristics only, as when Groq is unavailable
+                saves.append(pool.submit(_save_user, ai, user_id, snapshot, ai_results))
+            for future in as_completed(saves):
+                try:
+                    counts["insights"] += future.result()
+                    counts["users"] += 1
+                except Exception:
+                    counts["failed"] += 1
+            done = counts["users"] + counts["failed"]
+            report(done * 100 // max(total, 1), f"Generated insights for {done} of {total} users")
+
+    elapsed = time.perf_counter() - started
+    return {
+        **counts,
+        "shard": f"{shard_index}/{shard_count}",
+        "workers": INSIGHTS_MAX_WORKERS,
+        "seconds": round(elapsed, 3),
+        "users_per_second": round((counts["users"] + counts["failed"]) / elapsed, 3) if elapsed else 0.0,
+    }
+
+
+def run_generate_insights_job(db: Session, report: ProgressReporter, user_id: int) -> Dict[str, Any]:
+    """Background job: regenerate one user's insights (POST /api/insights/generate).
+
+    The old insights are replaced in the same commit that saves the new ones,
+    so readers keep seeing the previous set until this finishes.
+    """
+    report(10, "Generating insights")
+    insights = InsightsAI().generate_insights_for_user(user_id, db)
+    return {"insights_generated": len(insights)}
+
+
+def _job_generate_all_users():
+    # Runs as a background job so each nightly run leaves a background_jobs row
+    # with its progress and throughput; one run per shard across API workers.
+    enqueue_scheduled_job(
+        "insights_nightly",
+        run_nightly_insights_job,
+        dedupe_key=f"insights_nightly:{INSIGHTS_SHARD_INDEX}/{INSIGHTS_SHARD_COUNT}",
+        shard_index=INSIGHTS_SHARD_INDEX,
+        shard_count=INSIGHTS_SHARD_COUNT,
+    )
+
+
+def _job_refresh_all_balances():
+    # one refresh per interval across API workers, not one per worker
+    enqueue_scheduled_job(
+        "balance_refresh",
+        run_balance_refresh_job,
+        dedupe_key="balance_refresh",
+        min_interval_seconds=BALANCE_REFRESH_INTERVAL_MINUTES * 60 / 2,
+    )
+
+
 def start_scheduler():
     global _scheduler
     if _scheduler is not None and _scheduler.running:
@@ -29,6 +171,8 @@ def start_scheduler():
     scheduler = BackgroundScheduler()
     # Run daily at 06:00 UTC
     scheduler.add_job(_job_generate_all_users, 'cron', hour=6, minute=0)
+    # Keep account balances fresh between user-triggered syncs
+    scheduler.add_job(_job_refresh_all_balances, 'interval', minutes=BALANCE_REFRESH_INTERVAL_MINUTES)
     scheduler.start()
     _scheduler = scheduler
     return _scheduler
@@ -0,0 +1,289 @@
+import os
+import threading
+import time
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Optional, Set
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal, engine
+from app.models import BackgroundJob
+
+
+# Threads running background jobs in this process
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+# Jobs live only in the memory of the process that queued them, which
+# heartbeats their rows; a queued/running job whose heartbeat is older than
+# JOB_ABANDONED_AFTER_SECONDS belonged to a process that died and is failed.
+JOB_HEARTBEAT_SECONDS = int(os.getenv("JOB_HEARTBEAT_SECONDS", "30"))
+JOB_ABANDONED_AFTER_SECONDS = int(os.getenv("JOB_ABANDONED_AFTER_SECONDS", "120"))
+# find_active_job only joins jobs started (or queued) this recently; a request
+# after that gets a fresh job rather than waiting on one that may be stuck
+JOB_JOIN_TIMEOUT_SECONDS = int(os.getenv("JOB_JOIN_TIMEOUT_SECONDS", "600"))
+
+# A job function receives its own session, a progress reporter and the
+# keyword params it was enqueued with, and returns a JSON-serializable dict.
+ProgressReporter = Callable[[int, Optional[str]], None]
+JobFunction = Callable[..., Optional[Dict[str, Any]]]
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+# Queued (including debounced) and running jobs held by this process
+_owned_jobs: Set[str] = set()
+_owned_jobs_lock = threading.Lock()
+_heartbeat_thread: Optional[threading.Thread] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job-worker")
+    return _executor
+
+
+def _heartbeat_loop() -> None:
+    while True:
+        time.sleep(JOB_HEARTBEAT_SECONDS)
+        with _owned_jobs_lock:
+            job_ids = list(_owned_jobs)
+        if not job_ids:
+            continue
+        db = SessionLocal()
+        try:
+            db.query(BackgroundJob).filter(
+                BackgroundJob.id.in_(job_ids),
+                BackgroundJob.status.in_(("queued", "running")),
+            ).update({"heartbeat_at": func.now()}, synchronize_session=False)
+            db.commit()
+        except Exception:
+            db.rollback()  # try again next beat
+        finally:
+            db.close()
+
+
+def _own(job_id: str) -> None:
+    global _heartbeat_thread
+    with _owned_jobs_lock:
+        _owned_jobs.add(job_id)
+        if _heartbeat_thread is None:
+            _heartbeat_thread = threading.Thread(target=_heartbeat_loop, name="job-heartbeat", daemon=True)
+            _heartbeat_thread.start()
+
+
+def _disown(job_id: str) -> None:
+    with _owned_jobs_lock:
+        _owned_jobs.discard(job_id)
+
+
+def fail_abandoned_jobs(db: Session, dedupe_key: Optional[str] = None) -> int:
+    """Fail queued/running jobs whose owning process stopped heartbeating.
+
+    Run at startup and before coalescing into a job by ``dedupe_key``, so a
+    job lost in a restart neither blocks its key nor absorbs new requests.
+    Returns the number of jobs failed; commits.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=JOB_ABANDONED_AFTER_SECONDS)
+    query = db.query(BackgroundJob).filter(
+        BackgroundJob.status.in_(("queued", "running")),
+        func.coalesce(BackgroundJob.heartbeat_at, BackgroundJob.created_at) < cutoff,
+    )
+    if dedupe_key is not None:
+        query = query.filter(BackgroundJob.dedupe_key == dedupe_key)
+    failed = query.update(
+        {"status": "failed", "error": "Abandoned: the worker running this job stopped", "finished_at": func.now()},
+        synchronize_session=False,
+    )
+    db.commit()
+    return failed
+
+
+def _update_job(job_id: str, **fields: Any) -> None:
+    """Write job bookkeeping in its own short transaction.
+
+    Kept separate from the job's working session so progress is visible to
+    pollers immediately and never commits half-done work.
+    """
+    db = SessionLocal()
+    try:
+        db.query(BackgroundJob).filter(BackgroundJob.id == job_id).update(fields, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _run_job(job_id: str, fn: JobFunction, params: Dict[str, Any]) -> None:
+    _update_job(job_id, status="running", started_at=datetime.now(timezone.utc))
+
+    def report(progress: int, stage: Optional[str] = None) -> None:
+        _update_job(job_id, progress=max(0, min(100, int(progress))), stage=stage)
+
+    db = SessionLocal()
+    try:
+        result = fn(db, report, **params)
+        _update_job(
+            job_id,
+            status="succeeded",
+            progress=100,
+            result=result,
+            finished_at=datetime.now(timezone.utc),
+        )
+    except Exception as e:
+        db.rollback()
+        _update_job(job_id, status="failed", error=str(e), finished_at=datetime.now(timezone.utc))
+    finally:
+        _disown(job_id)
+        db.close()
+
+
+def _submit(job_id: str, fn: JobFunction, params: Dict[str, Any]) -> None:
+    try:
+        _get_executor().submit(_run_job, job_id, fn, params)
+    except RuntimeError as e:
+        # executor shut down (interpreter exiting); don't leave the row queued
+        _disown(job_id)
+        _update_job(job_id, status="failed", error=f"Not started: {e}", finished_at=datetime.now(timezone.utc))
+
+
+def enqueue_job(
+    db: Session,
+    kind: str,
+    fn: JobFunction,
+    user_id: Optional[int] = None,
+    dedupe_key: Optional[str] = None,
+    delay_seconds: float = 0,
+    **params: Any,
+) -> BackgroundJob:
+    """Record a queued job and hand it to the in-process worker pool.
+
+    ``fn`` is called as ``fn(db, report, user_id=user_id, **params)`` when the
+    job belongs to a user, otherwise ``fn(db, report, **params)``. The job row is
+    committed before the work is submitted, so the returned id can be polled
+    (from any API worker) as soon as this returns.
+
+    With a ``dedupe_key``, a request that finds a job with the same key still
+    queued returns that job instead of creating another. Combined with
+    ``delay_seconds`` this debounces bursts: the job waits out the delay while
+    queued and absorbs every duplicate that arrives in the meantime.
+    """
+    if dedupe_key is not None:
+        existing = _find_queued(db, dedupe_key)
+        if existing is not None:
+            return existing
+
+    job = BackgroundJob(
+        id=uuid.uuid4().hex,
+        user_id=user_id,
+        kind=kind,
+        dedupe_key=dedupe_key,
+        status="queued",
+        progress=0,
+    )
+    db.add(job)
+    try:
+        db.commit()
+    except IntegrityError:
+        # lost a race with another request for the same dedupe key
+        db.rollback()
+        existing = _find_queued(db, dedupe_key) if dedupe_key is not None else None
+        if existing is None:
+            raise
+        return existing
+    db.refresh(job)
+
+    if user_id is not None:
+        params = {"user_id": user_id, **params}
+    _own(job.id)
+    if delay_seconds > 0:
+        timer = threading.Timer(delay_seconds, _submit, args=(job.id, fn, params))
+        timer.daemon = True
+        timer.start()
+    else:
+        _submit(job.id, fn, params)
+    return job
+
+
+def _find_queued(db: Session, dedupe_key: str) -> Optional[BackgroundJob]:
+    fail_abandoned_jobs(db, dedupe_key)
+    return db.query(BackgroundJob).filter(
+        BackgroundJob.dedupe_key == dedupe_key,
+        BackgroundJob.status == "queued",
+    ).first()
+
+
+def find_active_job(
+    db: Session,
+    dedupe_key: str,
+    max_age_seconds: Optional[int] = JOB_JOIN_TIMEOUT_SECONDS,
+) -> Optional[BackgroundJob]:
+    """A queued or running job with this dedupe key, if any.
+
+    ``enqueue_job`` only coalesces into queued jobs; callers that also want to
+    join a job already in progress check here first. Abandoned jobs are failed
+    first, and jobs started (or, if not started, queued) more than
+    ``max_age_seconds`` ago aren't joined; pass None to join any live job.
+    """
+    fail_abandoned_jobs(db, dedupe_key)
+    query = db.query(BackgroundJob).filter(
+        BackgroundJob.dedupe_key == dedupe_key,
+        BackgroundJob.status.in_(("queued", "running")),
+    )
+    if max_age_seconds is not None:
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=max_age_seconds)
+        query = query.filter(func.coalesce(BackgroundJob.started_at, BackgroundJob.created_at) >= cutoff)
+    return query.order_by(BackgroundJob.created_at.desc()).first()
+
+
+def enqueue_scheduled_job(
+    kind: str,
+    fn: JobFunction,
+    dedupe_key: str,
+    min_interval_seconds: Optional[float] = None,
+    **params: Any,
+) -> Optional[BackgroundJob]:
+    """Enqueue a scheduler-driven job once across every API worker.
+
+    Each worker runs its own scheduler, so the check-and-enqueue is serialized
+    on a Postgres advisory lock for ``dedupe_key``: the first worker queues the
+    job and the others find it queued or running. With
+    ``min_interval_seconds`` a job for the key created (and not failed) that
+    recently also counts, so workers whose interval timers are out of step
+    don't each run it. Returns the new job, or None when skipped.
+    """
+    lock_id = zlib.crc32(dedupe_key.encode())
+    # session-level lock on its own connection, since enqueue_job commits
+    with engine.connect() as lock_conn:
+        lock_conn.execute(select(func.pg_advisory_lock(lock_id)))
+        db = SessionLocal()
+        try:
+            # a scheduled run can outlast the join timeout; heartbeats tell if it's alive
+            if find_active_job(db, dedupe_key, max_age_seconds=None) is not None:
+                return None
+            if min_interval_seconds is not None:
+                cutoff = datetime.now(timezone.utc) - timedelta(seconds=min_interval_seconds)
+                recent = db.query(BackgroundJob.id).filter(
+                    BackgroundJob.dedupe_key == dedupe_key,
+                    BackgroundJob.status != "failed",
+                    BackgroundJob.created_at >= cutoff,
+                ).first()
+                if recent is not None:
+                    return None
+            return enqueue_job(db, kind, fn, dedupe_key=dedupe_key, **params)
+        finally:
+            db.close()
+            lock_conn.execute(select(func.pg_advisory_unlock(lock_id)))
+
+
+def get_job(db: Session, job_id: str, user_id: Optional[int] = None) -> Optional[BackgroundJob]:
+    """Fetch a job, optionally scoped to the user who owns it."""
+    query = db.query(BackgroundJob).filter(BackgroundJob.id == job_id)
+    if user_id is not None:
+        query = query.filter(BackgroundJob.user_id == user_id)
+    return query.first()
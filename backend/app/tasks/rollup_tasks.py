@@ -0,0 +1,48 @@
+"""Rebuild daily_category_rollup from transactions.
+
+Repair command for a rollup that has drifted from the raw rows (e.g. sync
+wrote deltas into an empty table created by ``create_all`` before migration
+007 ran). From the backend directory:
+
+    python -m app.tasks.rollup_tasks              # every user
+    python -m app.tasks.rollup_tasks --user-id 42 # one user
+"""
+import argparse
+from typing import Iterable, Optional
+
+from app.database import SessionLocal
+from app.models import User
+from app.services.budget_service import invalidate_budget_cache
+from app.services.rollup_service import rebuild_rollup_for_user
+
+
+def rebuild_rollups(user_ids: Optional[Iterable[int]] = None) -> int:
+    """Rebuild the rollup for ``user_ids`` (default: all users), one commit per user."""
+    db = SessionLocal()
+    try:
+        if user_ids is None:
+            user_ids = [row.id for row in db.query(User.id).order_by(User.id)]
+        rebuilt = 0
+        for user_id in user_ids:
+            rebuild_rollup_for_user(db, user_id)
+            invalidate_budget_cache(db, user_id)
+            db.commit()
+            rebuilt += 1
+        return rebuilt
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--user-id", type=int, action="append", dest="user_ids",
+                        help="rebuild only this user (repeatable)")
+    args = parser.parse_args()
+    print(f"rebuilt daily_category_rollup for {rebuild_rollups(args.user_ids)} user(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+from datetime import datetime
+from typing import Any, Dict
+
+from sqlalchemy.orm import Session
+
+from app.services.insights_service import InsightsAI
+from app.services.transaction_service import sync_transactions_for_item, sync_transactions_for_user
+from app.tasks.job_queue import ProgressReporter
+
+
+def run_transactions_sync_job(db: Session, report: ProgressReporter, user_id: int) -> Dict[str, Any]:
+    """Background job: sync the user's Plaid items, then refresh their insights."""
+    report(5, "Syncing transactions")
+    result: Dict[str, Any] = sync_transactions_for_user(user_id, db)
+    if result["items"] and result["failed"] == result["items"]:
+        raise RuntimeError(f"Sync failed for all {result['items']} linked item(s)")
+
+    report(70, "Generating insights")
+    # insights are best-effort; a failure here should not fail the sync
+    try:
+        insights = InsightsAI().generate_insights_for_user(user_id, db)
+        result["insights_generated"] = len(insights)
+    except Exception:
+        db.rollback()
+        result["insights_generated"] = 0
+    return result
+
+
+def run_stale_items_sync_job(db: Session, report: ProgressReporter, user_id: int, synced_before: datetime) -> Dict[str, Any]:
+    """Background job: sync the user's items not synced since ``synced_before``."""
+    report(5, "Syncing transactions")
+    return sync_transactions_for_user(user_id, db, synced_before=synced_before)
+
+
+def run_item_sync_job(db: Session, report: ProgressReporter, user_id: int, plaid_item_id: int) -> Dict[str, Any]:
+    """Background job: sync a single Plaid item (e.g. after a webhook)."""
+    report(5, "Syncing transactions")
+    return sync_transactions_for_item(plaid_item_id, db)
@@ -0,0 +1,196 @@
+"""Benchmark insight aggregation: per-row Python loops vs ``TransactionFrame``.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.bench_insights_aggregation --rows 1000 10000 100000
+
+    # include the database read, against a disposable Postgres database
+    DATABASE_URL=postgresql://... python -m benchmarks.bench_insights_aggregation --db --rows 10000 50000
+
+In-memory mode times only the aggregation over synthetic rows. ``--db`` seeds
+a user and times the whole step as ``InsightsAI`` runs it: the old ORM load
+plus loops against ``TransactionFrame.load`` plus vectorized group-bys. Both
+modes check that the two produce the same aggregates.
+"""
+import argparse
+import random
+import statistics
+import time
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+from app.services.analytics import TransactionFrame, _day
+
+
+MERCHANTS = ["Starbucks", "Uber", "Amazon", "Safeway", "Netflix", "Shell", "Delta", "Target", None]
+CATEGORIES = ["FOOD_AND_DRINK", "TRANSPORTATION", "GENERAL_MERCHANDISE", "ENTERTAINMENT", "TRAVEL", "INCOME", None]
+
+
+def _aggregate_loops(txs: List[Any], last30_start: date) -> Dict[str, Any]:
+    """The aggregation previously inlined in ``_build_analysis_prompt``."""
+    expense_by_category: Dict[str, float] = {}
+    income_by_category: Dict[str, float] = {}
+    expense_by_merchant: Dict[str, float] = {}
+    income_by_merchant: Dict[str, float] = {}
+    large_txs: List[Dict[str, Any]] = []
+    total_expense = 0.0
+    total_income = 0.0
+    for t in txs:
+        cat = t.primary_category or "Uncategorized"
+        m = (t.merchant_name or t.name) or "Unknown"
+        if t.amount < 0:
+            expense_by_category[cat] = expense_by_category.get(cat, 0.0) + abs(float(t.amount))
+            expense_by_merchant[m] = expense_by_merchant.get(m, 0.0) + abs(float(t.amount))
+            total_expense += abs(float(t.amount))
+        elif t.amount > 0:
+            income_by_category[cat] = income_by_category.get(cat, 0.0) + float(t.amount)
+            income_by_merchant[m] = income_by_merchant.get(m, 0.0) + float(t.amount)
+            total_income += float(t.amount)
+        if abs(float(t.amount)) >= 100:
+            large_txs.append({"date": t.date.isoformat(), "amount": float(t.amount)})
+    expense_txs_last30 = sorted(
+        ({"date": t.date.isoformat(), "amount": abs(float(t.amount))} for t in txs if t.amount < 0 and t.date >= last30_start),
+        key=lambda x: x["date"], reverse=True,
+    )[:50]
+    return {
+        "expense_by_category": expense_by_category,
+        "income_by_category": income_by_category,
+        "expense_by_merchant": expense_by_merchant,
+        "income_by_merchant": income_by_merchant,
+        "totals": {"expense": total_expense, "income": total_income},
+        "large": len(large_txs[:50]),
+        "last30": len(expense_txs_last30),
+    }
+
+
+def _aggregate_frame(frame: TransactionFrame, last30_start: date, today: date) -> Dict[str, Any]:
+    return {
+        "expense_by_category": frame.expense_by_category(),
+        "income_by_category": frame.income_by_category(),
+        "expense_by_merchant": frame.expense_by_merchant(),
+        "income_by_merchant": frame.income_by_merchant(),
+        "totals": frame.totals(),
+        "large": len(frame.large_transactions(limit=50)),
+        "last30": len(frame.expense_transactions(limit=50, where=frame.between(last30_start, today))),
+    }
+
+
+def _same(a: Dict[str, Any], b: Dict[str, Any]) -> bool:
+    def rounded(d):
+        return {k: round(v, 2) for k, v in d.items()}
+    keys = ("expense_by_category", "income_by_category", "expense_by_merchant", "income_by_merchant", "totals")
+    return all(rounded(a[k]) == rounded(b[k]) for k in keys) and a["large"] == b["large"] and a["last30"] == b["last30"]
+
+
+def _synthetic(n: int, today: date) -> List[Any]:
+    txs = []
+    for _ in range(n):
+        merchant = random.choice(MERCHANTS)
+        txs.append(SimpleNamespace(
+            amount=Decimal(str(round(random.uniform(-400, 150), 2))),
+            date=today - timedelta(days=random.randint(0, 89)),
+            name=(merchant or f"TX {random.randint(1, 500)}").upper(),
+            merchant_name=merchant,
+            primary_category=random.choice(CATEGORIES),
+        ))
+    txs.sort(key=lambda t: t.date, reverse=True)
+    return txs
+
+
+def _time_ms(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def _run_in_memory(rows: List[int], repeat: int) -> None:
+    today = date.today()
+    last30_start = today - timedelta(days=30)
+    print(f"{'rows':>8} {'loops ms':>9} {'frame ms':>9} {'build ms':>9} {'speedup':>8} {'match':>6}")
+    for n in rows:
+        txs = _synthetic(n, today)
+        tuples = [(float(t.amount), _day(t.date), t.name, t.merchant_name, t.primary_category) for t in txs]
+        frame = TransactionFrame(tuples)
+        loops_ms = _time_ms(lambda: _aggregate_loops(txs, last30_start), repeat)
+        build_ms = _time_ms(lambda: TransactionFrame(tuples), repeat)
+        frame_ms = _time_ms(lambda: _aggregate_frame(frame, last30_start, today), repeat)
+        match = _same(_aggregate_loops(txs, last30_start), _aggregate_frame(frame, last30_start, today))
+        print(f"{n:>8} {loops_ms:>9.1f} {frame_ms:>9.1f} {build_ms:>9.1f} "
+              f"{loops_ms / (frame_ms + build_ms):>7.1f}x {str(match):>6}")
+
+
+def _run_db(rows: List[int], repeat: int) -> None:
+    from app.database import SessionLocal, engine
+    from app.models import Account, Base, PlaidItem, Transaction, User
+    from sqlalchemy import insert
+
+    Base.metadata.create_all(bind=engine)
+    today = date.today()
+    start_date = today - timedelta(days=90)
+    last30_start = today - timedelta(days=30)
+    db = SessionLocal()
+    print(f"{'rows':>8} {'orm+loops ms':>13} {'frame ms':>9} {'speedup':>8} {'match':>6}")
+    for n in rows:
+        tag = uuid.uuid4().hex[:8]
+        user = User(email=f"bench-{tag}@example.com", hashed_password="x", first_name="Bench", last_name="User")
+        db.add(user)
+        db.flush()
+        item = PlaidItem(user_id=user.id, access_token=f"access-{tag}", item_id=f"item-{tag}",
+                         institution_id="ins_bench", institution_name="Bench Bank")
+        db.add(item)
+        db.flush()
+        account = Account(user_id=user.id, plaid_item_id=item.id, account_id=f"acc-{tag}",
+                          name="Bench Checking", type="depository", subtype="checking")
+        db.add(account)
+        db.flush()
+        db.execute(insert(Transaction.__table__), [
+            {"user_id": user.id, "account_id": account.id, "plaid_transaction_id": uuid.uuid4().hex,
+             "amount": t.amount, "date": t.date, "name": t.name, "merchant_name": t.merchant_name,
+             "primary_category": t.primary_category, "pending": False}
+            for t in _synthetic(n, today)
+        ])
+        db.commit()
+        try:
+            def old():
+                txs = db.query(Transaction).filter(
+                    Transaction.user_id == user.id, Transaction.date >= start_date, Transaction.date <= today,
+                ).all()
+                result = _aggregate_loops(txs, last30_start)
+                db.expunge_all()
+                return result
+
+            def new():
+                return _aggregate_frame(TransactionFrame.load(db, user.id, start_date, today), last30_start, today)
+
+            old_ms = _time_ms(old, repeat)
+            new_ms = _time_ms(new, repeat)
+            print(f"{n:>8} {old_ms:>13.1f} {new_ms:>9.1f} {old_ms / new_ms:>7.1f}x {str(_same(old(), new())):>6}")
+        finally:
+            db.query(Transaction).filter(Transaction.user_id == user.id).delete(synchronize_session=False)
+            db.query(Account).filter(Account.user_id == user.id).delete(synchronize_session=False)
+            db.query(PlaidItem).filter(PlaidItem.user_id == user.id).delete(synchronize_session=False)
+            db.query(User).filter(User.id == user.id).delete(synchronize_session=False)
+            db.commit()
+    db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--db", action="store_true", help="include the database read (needs DATABASE_URL)")
+    args = parser.parse_args()
+    if args.db:
+        _run_db(args.rows, args.repeat)
+    else:
+        _run_in_memory(args.rows, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""End-to-end Plaid sync throughput and latency against the local Plaid stand-in.
+
+Usage (from the backend directory, against a disposable Postgres database):
+
+    DATABASE_URL=postgresql://... python -m benchmarks.bench_sync_throughput \
+        --items 1 10 100 --transactions-per-account 200 --latency-ms 150
+
+For each item count a fresh user is linked to that many fake items and
+``sync_transactions_for_user`` is timed for the initial (full history) sync and
+for repeated incremental syncs that pick up a few new transactions each.
+"""
+import argparse
+import statistics
+import time
+import uuid
+
+from app.database import SessionLocal, engine
+from app.models import Account, Base, DailyCategoryRollup, PlaidItem, Transaction, User
+from app.services.plaid_client import set_plaid_client
+from app.services.transaction_service import SYNC_MAX_WORKERS, sync_transactions_for_user
+from benchmarks.fake_plaid import FakePlaidApi
+
+
+def _setup_user(db, fake: FakePlaidApi, num_items: int) -> int:
+    tag = uuid.uuid4().hex[:8]
+    user = User(email=f"bench-{tag}@example.com", hashed_password="x", first_name="Bench", last_name="User")
+    db.add(user)
+    db.flush()
+    for i in range(num_items):
+        access_token = f"access-bench-{tag}-{i}"
+        item = PlaidItem(user_id=user.id, access_token=access_token, item_id=f"item-{access_token}",
+                         institution_id="ins_fake", institution_name="Fake Bank")
+        db.add(item)
+        db.flush()
+        # setup is not part of the measurement; read the fake directly
+        for a in fake._item(access_token)["accounts"]:
+            db.add(Account(user_id=user.id, plaid_item_id=item.id, account_id=a["account_id"], name=a["name"],
+                           type=a["type"], subtype=a["subtype"], mask=a["mask"],
+                           balance_current=a["balances"]["current"], balance_available=a["balances"]["available"]))
+    db.commit()
+    return user.id
+
+
+def _teardown_user(db, user_id: int) -> None:
+    db.query(Transaction).filter(Transaction.user_id == user_id).delete(synchronize_session=False)
+    db.query(DailyCategoryRollup).filter(DailyCategoryRollup.user_id == user_id).delete(synchronize_session=False)
+    db.query(Account).filter(Account.user_id == user_id).delete(synchronize_session=False)
+    db.query(PlaidItem).filter(PlaidItem.user_id == user_id).delete(synchronize_session=False)
+    db.query(User).filter(User.id == user_id).delete(synchronize_session=False)
+    db.commit()
+
+
+def _percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--accounts-per-item", type=int, default=2)
+    parser.add_argument("--transactions-per-account", type=int, default=200)
+    parser.add_argument("--new-per-sync", type=int, default=5, help="new transactions per item per incremental sync")
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    parser.add_argument("--jitter-ms", type=float, default=25.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--workers", type=int, default=SYNC_MAX_WORKERS)
+    parser.add_argument("--repeat", type=int, default=5, help="incremental syncs to time per item count")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    print(f"workers={args.workers} latency={args.latency_ms}±{args.jitter_ms}ms error_rate={args.error_rate} "
+          f"accounts/item={args.accounts_per_item} tx/account={args.transactions_per_account}")
+    print(f"{'items':>6} {'initial s':>10} {'rows':>8} {'rows/s':>9} {'incr p50 ms':>12} {'incr p95 ms':>12} {'plaid calls':>12} {'failed':>7}")
+
+    db = SessionLocal()
+    try:
+        for num_items in args.items:
+            fake = FakePlaidApi(
+                accounts_per_item=args.accounts_per_item,
+                transactions_per_account=args.transactions_per_account,
+                new_transactions_per_sync=args.new_per_sync,
+                latency_ms=args.latency_ms,
+                latency_jitter_ms=args.jitter_ms,
+                error_rate=args.error_rate,
+            )
+            set_plaid_client(fake)
+            user_id = _setup_user(db, fake, num_items)
+            try:
+                start = time.perf_counter()
+                counts = sync_transactions_for_user(user_id, db, max_workers=args.workers)
+                initial = time.perf_counter() - start
+                rows = counts["created"] + counts["updated"]
+
+                incremental_ms = []
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    sync_transactions_for_user(user_id, db, max_workers=args.workers)
+                    incremental_ms.append((time.perf_counter() - start) * 1000)
+
+                print(f"{num_items:>6} {initial:>10.2f} {rows:>8} {rows / initial:>9.0f} "
+                      f"{statistics.median(incremental_ms):>12.1f} {_percentile(incremental_ms, 95):>12.1f} "
+                      f"{sum(fake.calls.values()):>12} {counts['failed']:>7}")
+            finally:
+                _teardown_user(db, user_id)
+    finally:
+        set_plaid_client(None)
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Benchmark the per-row vs bulk transaction upsert paths used by Plaid sync.
+
+Usage (from the backend directory, against a disposable Postgres database):
+
+    DATABASE_URL=postgresql://... python -m benchmarks.bench_sync_upsert --rows 5000
+
+Each path is timed twice: once inserting a fresh batch and once re-syncing the
+same batch (all updates), which is what a repeat sync looks like.
+"""
+import argparse
+import random
+import time
+import uuid
+from datetime import date, timedelta
+from typing import Any, Dict, List
+
+from app.database import SessionLocal, engine
+from app.models import Account, Base, DailyCategoryRollup, PlaidItem, Transaction, User
+from app.services.transaction_service import (
+    _bulk_upsert_transactions,
+    _normalize_transaction,
+    _upsert_transactions_per_row,
+)
+
+
+CATEGORIES = ["FOOD_AND_DRINK", "TRANSPORTATION", "GENERAL_MERCHANDISE", "RENT_AND_UTILITIES", "INCOME"]
+MERCHANTS = ["Starbucks", "Uber", "Amazon", "Safeway", "Netflix", "Shell", None]
+
+
+def _fake_plaid_transactions(n: int, plaid_account_id: str) -> List[Dict[str, Any]]:
+    today = date.today()
+    txs = []
+    for _ in range(n):
+        primary = random.choice(CATEGORIES)
+        txs.append({
+            "transaction_id": uuid.uuid4().hex,
+            "account_id": plaid_account_id,
+            "amount": round(random.uniform(-2000, 300), 2),
+            "date": today - timedelta(days=random.randint(0, 89)),
+            "name": f"TX {random.randint(1, 10_000)}",
+            "merchant_name": random.choice(MERCHANTS),
+            "personal_finance_category": {"primary": primary, "detailed": f"{primary}_OTHER"},
+            "pending": False,
+        })
+    return txs
+
+
+def _setup(db) -> Account:
+    tag = uuid.uuid4().hex[:8]
+    user = User(email=f"bench-{tag}@example.com", hashed_password="x", first_name="Bench", last_name="User")
+    db.add(user)
+    db.flush()
+    item = PlaidItem(user_id=user.id, access_token=f"access-{tag}", item_id=f"item-{tag}",
+                     institution_id="ins_bench", institution_name="Bench Bank")
+    db.add(item)
+    db.flush()
+    account = Account(user_id=user.id, plaid_item_id=item.id, account_id=f"acc-{tag}",
+                      name="Bench Checking", type="depository", subtype="checking")
+    db.add(account)
+    db.commit()
+    return account
+
+
+def _teardown(db, account: Account) -> None:
+    user_id = account.user_id
+    db.query(Transaction).filter(Transaction.user_id == user_id).delete(synchronize_session=False)
+    db.query(DailyCategoryRollup).filter(DailyCategoryRollup.user_id == user_id).delete(synchronize_session=False)
+    db.query(Account).filter(Account.user_id == user_id).delete(synchronize_session=False)
+    db.query(PlaidItem).filter(PlaidItem.user_id == user_id).delete(synchronize_session=False)
+    db.query(User).filter(User.id == user_id).delete(synchronize_session=False)
+    db.commit()
+
+
+def _timed(label: str, fn, db, rows) -> None:
+    start = time.perf_counter()
+    created, updated = fn(db, rows)
+    db.commit()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<24} {len(rows):>7} rows  {elapsed:8.3f}s  {len(rows) / elapsed:>10.0f} rows/s"
+          f"  (created={created}, updated={updated})")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        for label, fn in (("per-row", _upsert_transactions_per_row), ("bulk", _bulk_upsert_transactions)):
+            account = _setup(db)
+            try:
+                plaid_txs = _fake_plaid_transactions(args.rows, account.account_id)
+                rows = [_normalize_transaction(tr, account.user_id, account.id) for tr in plaid_txs]
+                _timed(f"{label} (insert)", fn, db, rows)
+                _timed(f"{label} (re-sync)", fn, db, rows)
+            finally:
+                _teardown(db, account)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
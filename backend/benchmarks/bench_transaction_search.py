@@ -0,0 +1,168 @@
+"""Benchmark transaction search with and without the pg_trgm indexes (migration 009).
+
+Usage (from the backend directory, against a disposable Postgres database with
+the pg_trgm extension available):
+
+    DATABASE_URL=postgresql://... python -m benchmarks.bench_transaction_search \
+        --rows 1000000 --users 10
+
+Seeds ``--rows`` transactions across ``--users`` users server-side, then times
+``GET /api/transactions?search=...`` (by date and by relevance) for one user,
+first with the trigram indexes and then with them dropped inside a transaction
+that is rolled back afterwards. The plan's scan nodes are printed alongside.
+"""
+import argparse
+import statistics
+import time
+import uuid
+from typing import List
+
+from fastapi import Response
+from sqlalchemy import text
+
+from app.api.transactions import list_transactions
+from app.database import SessionLocal, engine
+from app.models import Account, Base, PlaidItem, Transaction, User
+
+
+MERCHANTS = [
+    "Starbucks", "Chipotle Mexican Grill", "Safeway", "Whole Foods Market", "Trader Joe's", "Uber", "Lyft",
+    "Shell", "Chevron", "Amazon", "Target", "Walmart", "Costco", "Netflix", "Spotify", "Comcast", "Verizon",
+    "Delta Air Lines", "United Airlines", "Marriott", "Airbnb", "Home Depot", "Lowe's", "CVS Pharmacy",
+    "Walgreens", "Apple", "Best Buy", "McDonald's", "Panera Bread", "Dunkin'", "Subway", "Peet's Coffee",
+    "Blue Bottle Coffee", "REI", "Nike", "Zara", "Sephora", "Petco", "Planet Fitness", "ACME Payroll",
+]
+CITIES = ["SAN FRANCISCO", "OAKLAND", "SEATTLE", "AUSTIN", "DENVER", "BOSTON", "CHICAGO", "PORTLAND"]
+TERMS = ["uber", "starbucks", "coffee", "whole foods", "amaz", "payroll", "xyzzy"]
+TRGM_INDEXES = ["idx_transactions_name_trgm", "idx_transactions_merchant_name_trgm"]
+
+_SEED_SQL = text("""
+    INSERT INTO transactions
+        (user_id, account_id, plaid_transaction_id, amount, date, name, merchant_name, primary_category, pending)
+    SELECT
+        :user_id,
+        :account_id,
+        :tag || '-' || g,
+        round((random() * 420 - 300)::numeric, 2),
+        current_date - (random() * 730)::int,
+        upper(m.merchant) || ' #' || (random() * 9999)::int || ' ' || c.city,
+        m.merchant,
+        'GENERAL_MERCHANDISE',
+        false
+    FROM generate_series(1, :n) AS g
+    CROSS JOIN LATERAL (
+        SELECT (:merchants)[1 + floor(random() * cardinality(:merchants))::int + (g * 0)] AS merchant
+    ) AS m
+    CROSS JOIN LATERAL (
+        SELECT (:cities)[1 + floor(random() * cardinality(:cities))::int + (g * 0)] AS city
+    ) AS c
+""")
+
+
+def _seed(db, rows: int, users: int) -> List[User]:
+    tag = uuid.uuid4().hex[:8]
+    seeded = []
+    per_user = rows // users
+    for u in range(users):
+        user = User(email=f"search-{tag}-{u}@example.com", hashed_password="x", first_name="Search", last_name="User")
+        db.add(user)
+        db.flush()
+        item = PlaidItem(user_id=user.id, access_token=f"access-{tag}-{u}", item_id=f"item-{tag}-{u}",
+                         institution_id="ins_bench", institution_name="Bench Bank")
+        db.add(item)
+        db.flush()
+        account = Account(user_id=user.id, plaid_item_id=item.id, account_id=f"acc-{tag}-{u}",
+                          name="Bench Checking", type="depository", subtype="checking")
+        db.add(account)
+        db.flush()
+        db.execute(_SEED_SQL, {"user_id": user.id, "account_id": account.id, "tag": f"{tag}-{u}", "n": per_user,
+                               "merchants": MERCHANTS, "cities": CITIES})
+        db.commit()
+        seeded.append(user)
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql("VACUUM ANALYZE transactions")
+    return seeded
+
+
+def _teardown(db, users: List[User]) -> None:
+    user_ids = [u.id for u in users]
+    for model in (Transaction, Account, PlaidItem):
+        db.query(model).filter(model.user_id.in_(user_ids)).delete(synchronize_session=False)
+    db.query(User).filter(User.id.in_(user_ids)).delete(synchronize_session=False)
+    db.commit()
+
+
+def _search(db, user: User, term: str, sort: str):
+    return list_transactions(
+        response=Response(), current_user=user, db=db, skip=0, limit=50, cursor=None, account_id=None,
+        start_date=None, end_date=None, category=None, search=term, sort=sort,
+    )
+
+
+def _time_ms(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def _scan_nodes(db, user_id: int, term: str) -> str:
+    plan = db.execute(text(
+        "EXPLAIN SELECT * FROM transactions WHERE user_id = :u "
+        "AND (name ILIKE :p OR merchant_name ILIKE :p) ORDER BY date DESC, id DESC LIMIT 51"
+    ), {"u": user_id, "p": f"%{term}%"}).scalars().all()
+    nodes = [line.strip().lstrip("-> ").split("  (")[0] for line in plan if "Scan" in line]
+    return "; ".join(nodes)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--terms", nargs="+", default=TERMS)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    has_trgm = db.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).first() is not None
+    has_indexes = db.execute(
+        text("SELECT count(*) FROM pg_indexes WHERE indexname = ANY(:names)"), {"names": TRGM_INDEXES}
+    ).scalar() == len(TRGM_INDEXES)
+    db.rollback()
+    if not (has_trgm and has_indexes):
+        raise SystemExit("pg_trgm indexes missing; apply database/migrations/009_add_transaction_search_trgm.sql first")
+
+    print(f"seeding {args.rows} transactions across {args.users} users...")
+    users = _seed(db, args.rows, args.users)
+    target = users[0]
+    try:
+        print(f"{'term':<12} {'matches':>8} {'trgm ms':>8} {'rel ms':>8} {'no-idx ms':>10} {'no-idx rel':>11}  plan (with index)")
+        results = {}
+        for term in args.terms:
+            matches = len(_search(db, target, term, "date"))
+            plan = _scan_nodes(db, target.id, term)
+            results[term] = [matches, _time_ms(lambda: _search(db, target, term, "date"), args.repeat),
+                             _time_ms(lambda: _search(db, target, term, "relevance"), args.repeat), plan]
+        db.rollback()
+
+        # same queries with the trigram indexes dropped (rolled back afterwards)
+        for name in TRGM_INDEXES:
+            db.execute(text(f"DROP INDEX {name}"))
+        for term in args.terms:
+            results[term] += [_time_ms(lambda: _search(db, target, term, "date"), args.repeat),
+                              _time_ms(lambda: _search(db, target, term, "relevance"), args.repeat)]
+        db.rollback()
+
+        for term, (matches, trgm_ms, rel_ms, plan, seq_ms, seq_rel_ms) in results.items():
+            print(f"{term:<12} {matches:>8} {trgm_ms:>8.1f} {rel_ms:>8.1f} {seq_ms:>10.1f} {seq_rel_ms:>11.1f}  {plan}")
+    finally:
+        db.rollback()
+        _teardown(db, users)
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
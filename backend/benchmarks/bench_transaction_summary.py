@@ -0,0 +1,147 @@
+"""Benchmark ``get_transaction_summary`` against the old load-and-sum approach.
+
+Usage (from the backend directory, against a disposable Postgres database):
+
+    DATABASE_URL=postgresql://... python -m benchmarks.bench_transaction_summary \
+        --transactions 50000 --periods 30 90 365 730
+
+A user is seeded with transactions spread over two years. For each period
+length (days back from today) the old version, the grouped query over
+transactions and the grouped query over daily_category_rollup are timed and
+their results compared.
+"""
+import argparse
+import random
+import statistics
+import time
+import uuid
+from datetime import date, timedelta
+from typing import Any, Dict, Optional
+
+from app.database import SessionLocal, engine
+from app.models import Account, Base, DailyCategoryRollup, PlaidItem, Transaction, User
+from app.services import rollup_service
+from app.services.transaction_service import _bulk_upsert_transactions, get_transaction_summary
+
+
+CATEGORIES = ["FOOD_AND_DRINK", "TRANSPORTATION", "GENERAL_MERCHANDISE", "RENT_AND_UTILITIES", "INCOME", None]
+
+
+def _summary_python(user_id: int, db, start_date: Optional[date] = None, end_date: Optional[date] = None) -> Dict[str, Any]:
+    """The previous implementation: hydrate every row and sum in Python."""
+    query = db.query(Transaction).filter(Transaction.user_id == user_id)
+    if start_date:
+        query = query.filter(Transaction.date >= start_date)
+    if end_date:
+        query = query.filter(Transaction.date <= end_date)
+    txs = query.all()
+    total_income = sum(t.amount for t in txs if t.amount > 0)
+    total_expenses = sum(-t.amount for t in txs if t.amount < 0)
+    by_category: Dict[str, float] = {}
+    for t in txs:
+        cat = t.primary_category or "Uncategorized"
+        by_category[cat] = by_category.get(cat, 0.0) + float(t.amount)
+    return {
+        "total_income": float(total_income),
+        "total_expenses": float(total_expenses),
+        "net_savings": float(total_income - total_expenses),
+        "transaction_count": len(txs),
+        "by_category": [{"category": k, "amount": float(v)} for k, v in by_category.items()],
+    }
+
+
+def _setup(db, n: int, history_days: int) -> int:
+    tag = uuid.uuid4().hex[:8]
+    user = User(email=f"bench-{tag}@example.com", hashed_password="x", first_name="Bench", last_name="User")
+    db.add(user)
+    db.flush()
+    item = PlaidItem(user_id=user.id, access_token=f"access-{tag}", item_id=f"item-{tag}",
+                     institution_id="ins_bench", institution_name="Bench Bank")
+    db.add(item)
+    db.flush()
+    account = Account(user_id=user.id, plaid_item_id=item.id, account_id=f"acc-{tag}",
+                      name="Bench Checking", type="depository", subtype="checking")
+    db.add(account)
+    db.flush()
+    today = date.today()
+    rows = []
+    for _ in range(n):
+        primary = random.choice(CATEGORIES)
+        rows.append({
+            "user_id": user.id,
+            "account_id": account.id,
+            "plaid_transaction_id": uuid.uuid4().hex,
+            "amount": round(random.uniform(-300, 120), 2),
+            "date": today - timedelta(days=random.randint(0, history_days - 1)),
+            "name": f"TX {random.randint(1, 10_000)}",
+            "merchant_name": None,
+            "category": [primary] if primary else None,
+            "primary_category": primary,
+            "pending": False,
+        })
+    _bulk_upsert_transactions(db, rows)
+    db.commit()
+    return user.id
+
+
+def _teardown(db, user_id: int) -> None:
+    db.query(Transaction).filter(Transaction.user_id == user_id).delete(synchronize_session=False)
+    db.query(DailyCategoryRollup).filter(DailyCategoryRollup.user_id == user_id).delete(synchronize_session=False)
+    db.query(Account).filter(Account.user_id == user_id).delete(synchronize_session=False)
+    db.query(PlaidItem).filter(PlaidItem.user_id == user_id).delete(synchronize_session=False)
+    db.query(User).filter(User.id == user_id).delete(synchronize_session=False)
+    db.commit()
+
+
+def _time_ms(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def _same(a: Dict[str, Any], b: Dict[str, Any]) -> bool:
+    cats_a = {c["category"]: round(c["amount"], 2) for c in a["by_category"]}
+    cats_b = {c["category"]: round(c["amount"], 2) for c in b["by_category"]}
+    return (a["transaction_count"] == b["transaction_count"] and cats_a == cats_b
+            and round(a["total_income"], 2) == round(b["total_income"], 2)
+            and round(a["total_expenses"], 2) == round(b["total_expenses"], 2))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transactions", type=int, default=50000)
+    parser.add_argument("--history-days", type=int, default=730)
+    parser.add_argument("--periods", type=int, nargs="+", default=[30, 90, 365, 730])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    user_id = _setup(db, args.transactions, args.history_days)
+    try:
+        print(f"{'days':>6} {'rows':>8} {'python ms':>10} {'sql ms':>8} {'rollup ms':>10} {'match':>6}")
+        for days in args.periods:
+            start_date = date.today() - timedelta(days=days - 1)
+            # expunge between runs so the ORM version pays for hydration every time
+            old = lambda: (_summary_python(user_id, db, start_date), db.expunge_all())[0]
+            new = lambda: get_transaction_summary(user_id, db, start_date)
+            old_ms = _time_ms(old, args.repeat)
+            rollup_service.DAILY_ROLLUP_ENABLED = False
+            sql_ms = _time_ms(new, args.repeat)
+            sql_result = new()
+            rollup_service.DAILY_ROLLUP_ENABLED = True
+            rollup_ms = _time_ms(new, args.repeat)
+            result = new()
+            match = _same(old(), result) and _same(sql_result, result)
+            print(f"{days:>6} {result['transaction_count']:>8} {old_ms:>10.1f} {sql_ms:>8.1f} "
+                  f"{rollup_ms:>10.1f} {str(match):>6}")
+    finally:
+        _teardown(db, user_id)
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
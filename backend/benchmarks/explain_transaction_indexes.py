@@ -0,0 +1,199 @@
+"""EXPLAIN-based regression check for the transaction indexes (migration 008).
+
+Usage (from the backend directory, against a disposable Postgres database):
+
+    DATABASE_URL=postgresql://... python -m benchmarks.explain_transaction_indexes \
+        --users 50 --transactions-per-user 4000
+
+Seeds several users' worth of transactions, runs VACUUM ANALYZE, then EXPLAINs
+the hot queries (listing, category spend, expense aggregates and the app's own
+raw-table aggregate queries) and checks that each is answered by the expected
+index with an index or index-only scan. Exits non-zero on any regression.
+"""
+import argparse
+import json
+import random
+import sys
+import uuid
+from datetime import date, timedelta
+from typing import Any, Dict, List, Set, Tuple
+
+from sqlalchemy import event, insert
+
+from app.database import SessionLocal, engine
+from app.models import Account, Base, PlaidItem, Transaction, User
+from app.services import rollup_service
+
+
+CATEGORIES = ["FOOD_AND_DRINK", "TRANSPORTATION", "GENERAL_MERCHANDISE", "RENT_AND_UTILITIES", "TRAVEL",
+              "ENTERTAINMENT", "INCOME", None]
+INDEX_SCANS = {"Index Scan", "Index Only Scan", "Bitmap Index Scan"}
+
+
+def _seed(db, users: int, per_user: int, history_days: int) -> List[int]:
+    tag = uuid.uuid4().hex[:8]
+    today = date.today()
+    user_ids = []
+    for u in range(users):
+        user = User(email=f"explain-{tag}-{u}@example.com", hashed_password="x", first_name="Explain", last_name="User")
+        db.add(user)
+        db.flush()
+        item = PlaidItem(user_id=user.id, access_token=f"access-{tag}-{u}", item_id=f"item-{tag}-{u}",
+                         institution_id="ins_bench", institution_name="Bench Bank")
+        db.add(item)
+        db.flush()
+        account = Account(user_id=user.id, plaid_item_id=item.id, account_id=f"acc-{tag}-{u}",
+                          name="Bench Checking", type="depository", subtype="checking")
+        db.add(account)
+        db.flush()
+        rows = []
+        for _ in range(per_user):
+            primary = random.choice(CATEGORIES)
+            rows.append({
+                "user_id": user.id,
+                "account_id": account.id,
+                "plaid_transaction_id": uuid.uuid4().hex,
+                "amount": round(random.uniform(-300, 120), 2),
+                "date": today - timedelta(days=random.randint(0, history_days - 1)),
+                "name": f"TX {random.randint(1, 10_000)}",
+                "primary_category": primary,
+                "category": [primary] if primary else None,
+                "pending": False,
+            })
+        db.execute(insert(Transaction.__table__), rows)
+        user_ids.append(user.id)
+    db.commit()
+    return user_ids
+
+
+def _teardown(db, user_ids: List[int]) -> None:
+    for model in (Transaction, Account, PlaidItem):
+        db.query(model).filter(model.user_id.in_(user_ids)).delete(synchronize_session=False)
+    db.query(User).filter(User.id.in_(user_ids)).delete(synchronize_session=False)
+    db.commit()
+
+
+def _vacuum_analyze() -> None:
+    # index-only scans need an up-to-date visibility map
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql("VACUUM ANALYZE transactions")
+
+
+def _scans(plan: Dict[str, Any]) -> Set[Tuple[str, str]]:
+    found = set()
+    if "Relation Name" in plan or "Index Name" in plan:
+        found.add((plan["Node Type"], plan.get("Index Name", "")))
+    for child in plan.get("Plans", []):
+        found |= _scans(child)
+    return found
+
+
+def _explain(db, sql: str, params: Any) -> Set[Tuple[str, str]]:
+    cursor = db.connection().connection.cursor()
+    cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return _scans(plan[0]["Plan"])
+
+
+def _capture(db, fn) -> Tuple[str, Any]:
+    """Run ``fn`` and return the last SQL statement it sent, with parameters."""
+    captured = []
+
+    def _listener(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", _listener)
+    try:
+        fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", _listener)
+    return captured[-1]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--transactions-per-user", type=int, default=4000)
+    parser.add_argument("--history-days", type=int, default=730)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    user_ids = _seed(db, args.users, args.transactions_per_user, args.history_days)
+    try:
+        _vacuum_analyze()
+        user_id = user_ids[len(user_ids) // 2]
+        today = date.today()
+        month_start = today - timedelta(days=29)
+        year_start = today - timedelta(days=364)
+
+        rollup_service.DAILY_ROLLUP_ENABLED = False  # exercise the raw-table paths
+        windows = [("FOOD_AND_DRINK", month_start, today), ("TRAVEL", year_start, today)]
+        checks = [
+            (
+                "list newest first",
+                "SELECT * FROM transactions WHERE user_id = %(u)s ORDER BY date DESC, id DESC LIMIT 50",
+                {"u": user_id},
+                {"idx_transactions_user_date_id"},
+            ),
+            (
+                "list date range",
+                "SELECT * FROM transactions WHERE user_id = %(u)s AND date >= %(s)s AND date <= %(e)s "
+                "ORDER BY date DESC, id DESC LIMIT 50",
+                {"u": user_id, "s": month_start, "e": today},
+                {"idx_transactions_user_date_id"},
+            ),
+            (
+                "list keyset page",
+                "SELECT * FROM transactions WHERE user_id = %(u)s AND (date, id) < (%(d)s, %(i)s) "
+                "ORDER BY date DESC, id DESC LIMIT 51",
+                {"u": user_id, "d": year_start, "i": 2**31 - 1},
+                {"idx_transactions_user_date_id"},
+            ),
+            (
+                "category spend",
+                "SELECT COALESCE(SUM(-amount), 0) FROM transactions WHERE user_id = %(u)s "
+                "AND primary_category = %(c)s AND amount < 0 AND date >= %(s)s AND date <= %(e)s",
+                {"u": user_id, "c": "FOOD_AND_DRINK", "s": month_start, "e": today},
+                {"idx_transactions_user_category_date", "idx_transactions_user_date_expenses"},
+            ),
+            (
+                "expenses by category",
+                "SELECT primary_category, SUM(-amount) FROM transactions WHERE user_id = %(u)s "
+                "AND amount < 0 AND date >= %(s)s AND date <= %(e)s GROUP BY primary_category",
+                {"u": user_id, "s": month_start, "e": today},
+                {"idx_transactions_user_date_expenses"},
+            ),
+            (
+                "category_totals (raw)",
+                *_capture(db, lambda: rollup_service.category_totals(db, user_id, month_start, today)),
+                {"idx_transactions_user_date_id", "idx_transactions_user_category_date"},
+            ),
+            (
+                "budget windows (raw)",
+                *_capture(db, lambda: rollup_service.expense_totals_for_windows(db, user_id, windows)),
+                {"idx_transactions_user_date_expenses"},
+            ),
+        ]
+
+        failures = 0
+        print(f"{'query':<24} {'ok':<4} scans")
+        for label, sql, params, expected_indexes in checks:
+            scans = _explain(db, sql, params)
+            ok = any(node in INDEX_SCANS and index in expected_indexes for node, index in scans) and not any(
+                node == "Seq Scan" for node, _ in scans
+            )
+            failures += not ok
+            described = ", ".join(f"{node} ({index})" if index else node for node, index in sorted(scans))
+            print(f"{label:<24} {'yes' if ok else 'NO':<4} {described}")
+        db.rollback()
+    finally:
+        _teardown(db, user_ids)
+        db.close()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
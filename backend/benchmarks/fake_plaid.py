@@ -0,0 +1,196 @@
+"""In-process stand-in for the Plaid API used by the sync benchmarks.
+
+``FakePlaidApi`` implements the subset of ``plaid_api.PlaidApi`` the backend
+calls, returning plain dicts shaped like Plaid's responses. Each access token
+maps to a deterministic item with a configurable number of accounts and
+transactions; latency and error injection are applied to every call.
+
+Install it with ``app.services.plaid_client.set_plaid_client(FakePlaidApi(...))``.
+"""
+import json
+import random
+import threading
+import time
+import zlib
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+import plaid
+
+
+MERCHANTS = [
+    ("Starbucks", "FOOD_AND_DRINK", "FOOD_AND_DRINK_COFFEE", (3, 12)),
+    ("Chipotle", "FOOD_AND_DRINK", "FOOD_AND_DRINK_FAST_FOOD", (9, 25)),
+    ("Safeway", "FOOD_AND_DRINK", "FOOD_AND_DRINK_GROCERIES", (20, 180)),
+    ("Uber", "TRANSPORTATION", "TRANSPORTATION_TAXIS_AND_RIDE_SHARES", (8, 60)),
+    ("Shell", "TRANSPORTATION", "TRANSPORTATION_GAS", (25, 90)),
+    ("Amazon", "GENERAL_MERCHANDISE", "GENERAL_MERCHANDISE_ONLINE_MARKETPLACES", (10, 300)),
+    ("Target", "GENERAL_MERCHANDISE", "GENERAL_MERCHANDISE_SUPERSTORES", (15, 200)),
+    ("Netflix", "ENTERTAINMENT", "ENTERTAINMENT_TV_AND_MOVIES", (15, 23)),
+    ("Comcast", "RENT_AND_UTILITIES", "RENT_AND_UTILITIES_INTERNET_AND_CABLE", (60, 120)),
+    ("Delta", "TRAVEL", "TRAVEL_FLIGHTS", (150, 700)),
+]
+PAYROLL = ("ACME Payroll", "INCOME", "INCOME_WAGES", (1500, 4000))
+
+
+class FakePlaidApi:
+    def __init__(
+        self,
+        accounts_per_item: int = 2,
+        transactions_per_account: int = 500,
+        history_days: int = 730,
+        new_transactions_per_sync: int = 0,
+        latency_ms: float = 0.0,
+        latency_jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int = 0,
+    ):
+        self.accounts_per_item = accounts_per_item
+        self.transactions_per_account = transactions_per_account
+        self.history_days = history_days
+        self.new_transactions_per_sync = new_transactions_per_sync
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.error_rate = error_rate
+        self.seed = seed
+        self.calls: Dict[str, int] = {}
+        self._items: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+
+    # -- simulation helpers -------------------------------------------------
+
+    def _simulate(self, endpoint: str) -> None:
+        with self._lock:
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+            jitter = self._rng.uniform(-self.latency_jitter_ms, self.latency_jitter_ms)
+            fail = self._rng.random() < self.error_rate
+        delay = max(0.0, self.latency_ms + jitter) / 1000.0
+        if delay:
+            time.sleep(delay)
+        if fail:
+            exc = plaid.ApiException(status=500, reason="Injected failure")
+            exc.body = json.dumps({
+                "error_type": "API_ERROR",
+                "error_code": "INTERNAL_SERVER_ERROR",
+                "error_message": f"injected failure in {endpoint}",
+            })
+            raise exc
+
+    def _item(self, access_token: str) -> Dict[str, Any]:
+        with self._lock:
+            item = self._items.get(access_token)
+            if item is None:
+                item = self._build_item(access_token)
+                self._items[access_token] = item
+            return item
+
+    def _build_item(self, access_token: str) -> Dict[str, Any]:
+        rng = random.Random(zlib.crc32(access_token.encode()) ^ self.seed)
+        accounts = []
+        for i in range(self.accounts_per_item):
+            is_credit = i % 3 == 2
+            accounts.append({
+                "account_id": f"{access_token}-acc-{i}",
+                "name": "Credit Card" if is_credit else ("Checking" if i % 3 == 0 else "Savings"),
+                "official_name": None,
+                "type": "credit" if is_credit else "depository",
+                "subtype": "credit card" if is_credit else ("checking" if i % 3 == 0 else "savings"),
+                "mask": f"{rng.randint(0, 9999):04d}",
+                "balances": {
+                    "current": round(rng.uniform(100, 20000), 2),
+                    "available": round(rng.uniform(100, 20000), 2),
+                    "iso_currency_code": "USD",
+                },
+            })
+        item = {"item_id": f"item-{access_token}", "accounts": accounts, "transactions": [], "rng": rng, "seq": 0}
+        for account in accounts:
+            for _ in range(self.transactions_per_account):
+                item["transactions"].append(self._new_transaction(item, account["account_id"]))
+        return item
+
+    def _new_transaction(self, item: Dict[str, Any], account_id: str, on: Optional[date] = None) -> Dict[str, Any]:
+        rng = item["rng"]
+        item["seq"] += 1
+        if rng.random() < 0.05:
+            name, primary, detailed, (lo, hi) = PAYROLL
+            amount = -round(rng.uniform(lo, hi), 2)  # Plaid: negative = money in
+        else:
+            name, primary, detailed, (lo, hi) = rng.choice(MERCHANTS)
+            amount = round(rng.uniform(lo, hi), 2)
+        tx_date = on or (date.today() - timedelta(days=rng.randint(0, self.history_days - 1)))
+        return {
+            "transaction_id": f"{item['item_id']}-tx-{item['seq']}",
+            "account_id": account_id,
+            "amount": amount,
+            "date": tx_date,
+            "name": name.upper(),
+            "merchant_name": name,
+            "category": None,
+            "personal_finance_category": {"primary": primary, "detailed": detailed},
+            "pending": False,
+        }
+
+    # -- PlaidApi surface ---------------------------------------------------
+
+    def link_token_create(self, request) -> Dict[str, Any]:
+        self._simulate("link_token_create")
+        return {"link_token": "link-fake-token", "expiration": (date.today() + timedelta(days=1)).isoformat()}
+
+    def item_public_token_exchange(self, request) -> Dict[str, Any]:
+        self._simulate("item_public_token_exchange")
+        access_token = f"access-fake-{request['public_token']}"
+        return {"access_token": access_token, "item_id": self._item(access_token)["item_id"]}
+
+    def item_get(self, request) -> Dict[str, Any]:
+        self._simulate("item_get")
+        item = self._item(request["access_token"])
+        return {"item": {"item_id": item["item_id"], "institution_id": "ins_fake"}}
+
+    def institutions_get_by_id(self, request) -> Dict[str, Any]:
+        self._simulate("institutions_get_by_id")
+        return {"institution": {"institution_id": request["institution_id"], "name": "Fake Bank"}}
+
+    def accounts_get(self, request) -> Dict[str, Any]:
+        self._simulate("accounts_get")
+        item = self._item(request["access_token"])
+        return {"accounts": [dict(a) for a in item["accounts"]], "item": {"item_id": item["item_id"]}}
+
+    def transactions_get(self, request) -> Dict[str, Any]:
+        self._simulate("transactions_get")
+        item = self._item(request["access_token"])
+        options = getattr(request, "options", None)
+        count = getattr(options, "count", 100) if options is not None else 100
+        offset = getattr(options, "offset", 0) if options is not None else 0
+        matching = sorted(
+            (t for t in item["transactions"] if request["start_date"] <= t["date"] <= request["end_date"]),
+            key=lambda t: t["date"],
+            reverse=True,
+        )
+        return {
+            "accounts": [dict(a) for a in item["accounts"]],
+            "transactions": matching[offset:offset + count],
+            "total_transactions": len(matching),
+        }
+
+    def transactions_sync(self, request) -> Dict[str, Any]:
+        self._simulate("transactions_sync")
+        item = self._item(request["access_token"])
+        count = getattr(request, "count", 100)
+        cursor = getattr(request, "cursor", None)
+        offset = int(cursor) if cursor else 0
+        with self._lock:
+            transactions: List[Dict[str, Any]] = item["transactions"]
+            if offset >= len(transactions) and self.new_transactions_per_sync:
+                for _ in range(self.new_transactions_per_sync):
+                    account = item["rng"].choice(item["accounts"])
+                    transactions.append(self._new_transaction(item, account["account_id"], on=date.today()))
+            page = transactions[offset:offset + count]
+        next_offset = offset + len(page)
+        return {
+            "added": page,
+            "modified": [],
+            "removed": [],
+            "next_cursor": str(next_offset),
+            "has_more": next_offset < len(transactions),
+        }
@@ -5,7 +5,7 @@ from sqlalchemy.orm import Session
 import uvicorn
 from dotenv import load_dotenv
 
-from app.database import get_db, engine
+from app.database import SessionLocal, get_db, engine
 from app.models import Base
 from app.auth.router import router as auth_router
 from app.api.dashboard import router as dashboard_router
@@ -14,6 +14,7 @@ from app.api.transactions import router as transactions_router
 from app.api.insights import router as insights_router
 from app.api.budgets import router as budgets_router
 from app.tasks.insight_tasks import start_scheduler
+from app.tasks.job_queue import fail_abandoned_jobs
 import os
 
 # Load environment variables
@@ -36,6 +37,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # keyset pagination for GET /api/transactions
 )
 
 # Security
@@ -60,6 +62,16 @@ async def health_check():
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
 
+# Fail jobs left queued/running by a previous process (crash, restart, redeploy)
+try:
+    _db = SessionLocal()
+    try:
+        fail_abandoned_jobs(_db)
+    finally:
+        _db.close()
+except Exception:
+    pass
+
 # Start scheduler (guard to avoid multiple in dev reloads)
 try:
     start_scheduler()
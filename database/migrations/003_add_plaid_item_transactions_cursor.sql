@@ -0,0 +1,7 @@
+-- Migration: 003_add_plaid_item_transactions_cursor.sql
+-- Description: Store the Plaid /transactions/sync cursor per item for incremental sync
+
+-- NULL means the item has never been synced incrementally; the first sync
+-- starts from the beginning of the item's history.
+ALTER TABLE plaid_items
+    ADD COLUMN IF NOT EXISTS transactions_cursor TEXT;
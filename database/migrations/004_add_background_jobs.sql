@@ -0,0 +1,18 @@
+-- Migration: 004_add_background_jobs.sql
+-- Description: Job records for work moved off the request thread (e.g. transaction sync)
+
+CREATE TABLE IF NOT EXISTS background_jobs (
+    id VARCHAR(32) PRIMARY KEY,
+    user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+    kind VARCHAR(50) NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',
+    progress INTEGER DEFAULT 0,
+    stage TEXT,
+    result JSONB,
+    error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP WITH TIME ZONE,
+    finished_at TIMESTAMP WITH TIME ZONE
+);
+
+CREATE INDEX IF NOT EXISTS idx_background_jobs_user_id ON background_jobs(user_id);
@@ -0,0 +1,10 @@
+-- Migration: 005_add_background_job_dedupe_key.sql
+-- Description: Let repeated requests for the same work (e.g. bursts of Plaid
+-- webhooks for one item) coalesce into a single queued background job
+
+ALTER TABLE background_jobs
+    ADD COLUMN IF NOT EXISTS dedupe_key VARCHAR(100);
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_background_jobs_queued_dedupe_key
+    ON background_jobs(dedupe_key)
+    WHERE status = 'queued';
@@ -0,0 +1,6 @@
+-- Migration: 006_add_plaid_item_transactions_synced_at.sql
+-- Description: Track when each Plaid item last synced so reads can serve local
+-- data and only re-sync items older than a TTL
+
+ALTER TABLE plaid_items
+    ADD COLUMN IF NOT EXISTS transactions_synced_at TIMESTAMP WITH TIME ZONE;
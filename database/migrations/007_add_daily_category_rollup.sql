@@ -0,0 +1,38 @@
+-- Migration: 007_add_daily_category_rollup.sql
+-- Description: Daily per-category totals maintained by sync, so summaries, budgets
+-- and insights can aggregate over days x categories instead of raw transactions
+
+CREATE TABLE IF NOT EXISTS daily_category_rollup (
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    date DATE NOT NULL,
+    primary_category TEXT NOT NULL,
+    income_sum DECIMAL(15,2) NOT NULL DEFAULT 0,
+    expense_sum DECIMAL(15,2) NOT NULL DEFAULT 0,
+    tx_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, date, primary_category)
+);
+
+-- Backfill from existing transactions, replacing whatever is there: if the app
+-- booted first, create_all made this table empty and sync has already written
+-- partial deltas into it. The lock holds sync's rollup writes until the
+-- backfill commits, so they apply on top of it.
+BEGIN;
+LOCK TABLE daily_category_rollup IN EXCLUSIVE MODE;
+DELETE FROM daily_category_rollup;
+
+INSERT INTO daily_category_rollup (user_id, date, primary_category, income_sum, expense_sum, tx_count)
+SELECT
+    user_id,
+    date,
+    COALESCE(primary_category, 'Uncategorized'),
+    COALESCE(SUM(amount) FILTER (WHERE amount > 0), 0),
+    COALESCE(SUM(-amount) FILTER (WHERE amount < 0), 0),
+    COUNT(*)
+FROM transactions
+GROUP BY user_id, date, COALESCE(primary_category, 'Uncategorized')
+ON CONFLICT (user_id, date, primary_category) DO UPDATE SET
+    income_sum = EXCLUDED.income_sum,
+    expense_sum = EXCLUDED.expense_sum,
+    tx_count = EXCLUDED.tx_count;
+
+COMMIT;
@@ -0,0 +1,29 @@
+-- Migration: 008_add_transaction_query_indexes.sql
+-- Description: Composite/covering indexes for the hot transaction access paths:
+-- per-user listing ordered by (date, id), category spend over a date range, and
+-- expense-only aggregates. Check plans with benchmarks/explain_transaction_indexes.py
+--
+-- Built CONCURRENTLY so writes to transactions (Plaid syncs) aren't blocked
+-- while they build. CONCURRENTLY can't run inside a transaction block: apply
+-- this file with plain psql (autocommit), not psql --single-transaction. If a
+-- build fails it leaves an INVALID index that IF NOT EXISTS would skip; drop
+-- it and re-run the file.
+
+-- GET /api/transactions: WHERE user_id = ? ORDER BY date DESC, id DESC
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transactions_user_date_id
+    ON transactions (user_id, date DESC, id DESC);
+
+-- Budget and insight spend: WHERE user_id = ? AND primary_category = ? AND date BETWEEN ...
+-- amount is included so the sums can be answered from the index alone
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transactions_user_category_date
+    ON transactions (user_id, primary_category, date) INCLUDE (amount);
+
+-- Expense-only aggregates: WHERE user_id = ? AND amount < 0 AND date BETWEEN ...
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transactions_user_date_expenses
+    ON transactions (user_id, date) INCLUDE (primary_category, amount)
+    WHERE amount < 0;
+
+-- user_id alone is now a prefix of the indexes above
+DROP INDEX CONCURRENTLY IF EXISTS ix_transactions_user_id;
+
+ANALYZE transactions;
@@ -0,0 +1,15 @@
+-- Migration: 009_add_transaction_search_trgm.sql
+-- Description: Trigram GIN indexes so the ILIKE '%term%' search on transaction
+-- name/merchant (GET /api/transactions?search=) can use an index instead of
+-- scanning every row, and so results can be ranked by similarity
+--
+-- Built CONCURRENTLY (outside a transaction, like 008) so syncs keep writing
+-- while the GIN indexes build.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transactions_name_trgm
+    ON transactions USING gin (name gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transactions_merchant_name_trgm
+    ON transactions USING gin (merchant_name gin_trgm_ops);
@@ -0,0 +1,13 @@
+-- Migration: 010_add_rate_limit_counters.sql
+-- Description: Sliding-window rate-limit counters shared by every API worker
+-- (one row per key per window; rows are purged once they expire)
+
+CREATE TABLE IF NOT EXISTS rate_limit_counters (
+    key VARCHAR(200) NOT NULL,
+    window_index BIGINT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    PRIMARY KEY (key, window_index)
+);
+
+CREATE INDEX IF NOT EXISTS ix_rate_limit_counters_expires_at ON rate_limit_counters(expires_at);
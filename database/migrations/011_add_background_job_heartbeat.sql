@@ -0,0 +1,6 @@
+-- Migration: 011_add_background_job_heartbeat.sql
+-- Description: Heartbeat written by the process that holds a queued/running job,
+-- so jobs lost in a restart can be failed instead of blocking their dedupe key
+
+ALTER TABLE background_jobs
+    ADD COLUMN IF NOT EXISTS heartbeat_at TIMESTAMP WITH TIME ZONE;
@@ -0,0 +1,6 @@
+-- Migration: 012_add_user_budget_cache_generation.sql
+-- Description: Per-user counter bumped whenever budget spending changes; the
+-- budget cache keys on it, so invalidation reaches every API worker
+
+ALTER TABLE users
+    ADD COLUMN IF NOT EXISTS budget_cache_generation INTEGER NOT NULL DEFAULT 0;
@@ -13,6 +13,8 @@ import {
   Budget,
   BudgetWithStatus,
   BudgetPeriod,
+  Job,
+  JobAccepted,
 } from '@/types';
 
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
@@ -100,28 +102,72 @@ export const plaidApi = {
 
 export default api;
 
+// Poll a background job until it finishes; resolves with the job's result, or
+// rejects once timeoutMs has passed without the job finishing
+const waitForJob = async <T,>(
+  statusUrl: string,
+  intervalMs: number = 1000,
+  timeoutMs: number = 5 * 60 * 1000
+): Promise<T> => {
+  const deadline = Date.now() + timeoutMs;
+  for (;;) {
+    const response: AxiosResponse<Job<T>> = await api.get(statusUrl);
+    const job = response.data;
+    if (job.status === 'succeeded') {
+      return job.result as T;
+    }
+    if (job.status === 'failed') {
+      throw new Error(job.error || 'Job failed');
+    }
+    if (Date.now() + intervalMs > deadline) {
+      throw new Error('Timed out waiting for job');
+    }
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+  }
+};
+
 // Transactions API
+type TransactionListParams = {
+  skip?: number;
+  limit?: number;
+  cursor?: string;
+  account_id?: number;
+  start_date?: string;
+  end_date?: string;
+  category?: string;
+  search?: string;
+  sort?: 'date' | 'relevance';
+};
+
 export const transactionsApi = {
-  list: async (params: {
-    skip?: number;
-    limit?: number;
-    account_id?: number;
-    start_date?: string;
-    end_date?: string;
-    category?: string;
-    search?: string;
-  }) => {
+  list: async (params: TransactionListParams) => {
     const response: AxiosResponse<any[]> = await api.get('/api/transactions', { params });
     return response.data;
   },
 
+  // Keyset pagination: pass next_cursor back as params.cursor; null on the last page
+  page: async (params: TransactionListParams) => {
+    const response: AxiosResponse<any[]> = await api.get('/api/transactions', { params });
+    return {
+      transactions: response.data,
+      next_cursor: (response.headers['x-next-cursor'] as string | undefined) ?? null,
+    };
+  },
+
   detail: async (id: number) => {
     const response: AxiosResponse<any> = await api.get(`/api/transactions/${id}`);
     return response.data;
   },
 
   sync: async () => {
-    const response: AxiosResponse<{ message: string; created: number; updated: number }> = await api.post('/api/transactions/sync');
+    const response: AxiosResponse<JobAccepted> = await api.post('/api/transactions/sync');
+    return waitForJob<{ created: number; updated: number; removed: number }>(
+      `/api/transactions/sync/${response.data.job_id}`
+    );
+  },
+
+  syncStatus: async (jobId: string) => {
+    const response: AxiosResponse<Job> = await api.get(`/api/transactions/sync/${jobId}`);
     return response.data;
   },
 
@@ -137,8 +183,14 @@ export const insightsApi = {
     const response: AxiosResponse<any[]> = await api.get('/api/insights');
     return response.data;
   },
+  // Queues generation and resolves once the new insights are saved; list() keeps
+  // returning the previous ones until then
   generate: async () => {
-    const response: AxiosResponse<any[]> = await api.post('/api/insights/generate');
+    const response: AxiosResponse<JobAccepted> = await api.post('/api/insights/generate');
+    return waitForJob<{ insights_generated: number }>(`/api/insights/generate/${response.data.job_id}`);
+  },
+  generateStatus: async (jobId: string) => {
+    const response: AxiosResponse<Job> = await api.get(`/api/insights/generate/${jobId}`);
     return response.data;
   },
   dismiss: async (id: number) => {
@@ -105,3 +105,23 @@ export interface BudgetWithStatus extends Budget {
   is_near_threshold: boolean;
 }
 
+
+export type JobStatus = 'queued' | 'running' | 'succeeded' | 'failed';
+
+export interface JobAccepted {
+  job_id: string;
+  status: JobStatus;
+}
+
+export interface Job<T = any> {
+  id: string;
+  kind: string;
+  status: JobStatus;
+  progress: number;
+  stage?: string;
+  result?: T;
+  error?: string;
+  created_at: string;
+  started_at?: string;
+  finished_at?: string;
+}